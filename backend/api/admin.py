@@ -1,3 +1,6 @@
 from django.contrib import admin
-from .models import Dataset
+from .models import AuthToken, Blob, ColumnSchema, Dataset
 admin.site.register(Dataset)
+admin.site.register(ColumnSchema)
+admin.site.register(Blob)
+admin.site.register(AuthToken)
@@ -0,0 +1,152 @@
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+import numpy as np
+from django.core.files import File
+from django.db import transaction
+from . import cache, columnar, dedup
+from .ingest import SummaryAccumulator, TeeReader, summarize_csv
+from .models import Blob, Dataset
+from .schema import Schema
+from .stats import compute_stats, merge_stats, refresh_percentiles
+from .storage import BLOCK_SIZE, compress_level, is_gzip
+
+
+class AppendError(ValueError):
+    pass
+
+
+def _header(f):
+    return f.readline().rstrip(b'\r\n')
+
+
+def table_aggregates(table):
+    """count/sum/sumsq per column from the columnar cache, for summaries stored before they were kept."""
+    aggregates = {'count': {}, 'sum': {}, 'sumsq': {}}
+    for col, values in table.columns.items():
+        values = np.asarray(values)
+        aggregates['count'][col] = int(np.count_nonzero(~np.isnan(values)))
+        aggregates['sum'][col] = float(np.nansum(values))
+        aggregates['sumsq'][col] = float(np.nansum(values * values))
+    return aggregates
+
+
+def fresh_stats(dataset):
+    """
+    Extended stats of `dataset`, with the percentiles that appends leave
+    stale recomputed from the columnar cache and stored back. The full pass
+    is paid once by the first reader that needs them, not by every append.
+    """
+    stats = (dataset.summary or {}).get('stats')
+    if not stats or not stats.get('percentiles_stale'):
+        return stats
+    with transaction.atomic():
+        dataset = Dataset.objects.select_for_update().get(pk=dataset.pk)
+        stats = dataset.summary.get('stats')
+        if stats and stats.get('percentiles_stale'):
+            refresh_percentiles(stats, columnar.table_for(dataset))
+            dataset.save(update_fields=['summary'])
+    cache.invalidate(dataset.uploaded_by_id, dataset.pk)
+    return stats
+
+
+def _unshare_file(dataset):
+    """Give `dataset` its own copy of a stored file other datasets still reference."""
+    if not dataset.blob_id or not Blob.objects.filter(pk=dataset.blob_id, refs__gt=1).exists():
+        return
+    storage = dataset.file.storage
+    with storage.open_raw(dataset.file.name) as raw:
+        name = storage.save(dataset.file.name, File(raw, dataset.file.name))
+    dedup.release([dataset.blob_id])
+    dataset.file.name = name
+    dataset.blob = Blob.objects.create(name=name)
+
+
+def _write_rows(path, body, compressed):
+    with open(path, 'ab') as out:
+        if compressed:
+            out = gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compress_level(), mtime=0)
+        with out:
+            shutil.copyfileobj(body, out, BLOCK_SIZE)
+
+
+def append_rows(dataset, upload):
+    """
+    Append the rows of `upload` (a CSV or .csv.gz whose header matches the
+    dataset's stored file) to a ready dataset: the stored file gains them
+    as one more gzip member, the columnar cache as appended column bytes,
+    and the summary and extended stats are merged from their stored moments
+    and Type counts (percentiles are left stale, see fresh_stats). Only the
+    new rows are read, parsed or written. Returns `(dataset, rows appended)`;
+    the caller invalidates caches afterwards.
+    """
+    with transaction.atomic():
+        # Appends to one dataset run one at a time
+        dataset = Dataset.objects.select_for_update().get(pk=dataset.pk)
+        schema = Schema.from_dict(dataset.schema)
+        table = columnar.load(dataset.pk)
+        # Through the storage: a closed FieldFile can't be reopened, and table_for below needs it
+        with dataset.file.storage.open(dataset.file.name, 'rb') as f:
+            expected = _header(f)
+        upload.seek(0)
+        source = gzip.GzipFile(fileobj=upload, mode='rb') if is_gzip(upload) else upload
+        header = _header(source)
+        if header != expected:
+            raise AppendError(f"Header does not match the dataset's: expected {expected.decode(errors='replace')!r}")
+        names = next(csv.reader([header.decode('utf-8-sig')]))
+
+        aggregates = dataset.summary.get('aggregates')
+        if aggregates is None:
+            table = columnar.table_for(dataset)
+            aggregates = table_aggregates(table)
+        writer = columnar.ColumnarWriter(schema, categories=table.categories if table else ())
+        with tempfile.TemporaryFile() as body:
+            # The stored file may not end with a newline until an earlier append normalized it
+            if not dataset.summary.get('appends'):
+                body.write(b'\n')
+            tee = TeeReader(source, body)
+            try:
+                added = summarize_csv(tee, sink=writer, schema=schema, names=names)
+                tee.drain()
+                if not added['total_count']:
+                    raise AppendError('No rows to append')
+            except Exception:
+                writer.abort()
+                raise
+            if tee.tail != b'\n':
+                body.write(b'\n')
+
+            acc = SummaryAccumulator.from_summary(schema, dataset.summary, aggregates)
+            acc.merge(SummaryAccumulator.from_summary(schema, added, added['aggregates']))
+            summary = acc.summary()
+            stats = dataset.summary.get('stats')
+            if stats is not None:
+                summary['stats'] = merge_stats(stats, compute_stats(writer.finish()))
+            summary['appends'] = dataset.summary.get('appends', 0) + 1
+
+            _unshare_file(dataset)
+            storage = dataset.file.storage
+            path = storage.path(dataset.file.name)
+            with storage.open_raw(dataset.file.name) as raw:
+                compressed = is_gzip(raw)
+            size = os.path.getsize(path)
+            body.seek(0)
+            try:
+                _write_rows(path, body, compressed)
+                dataset.summary = summary
+                dataset.size = os.path.getsize(path)
+                # The content no longer matches the upload it was hashed from
+                dataset.content_hash = ''
+                dataset.save(update_fields=['file', 'summary', 'size', 'content_hash', 'blob'])
+            except Exception:
+                os.truncate(path, size)
+                writer.abort()
+                raise
+        if table is None:
+            # No cache to extend; it is built from the stored file when next needed
+            writer.abort()
+        else:
+            columnar.extend(dataset.pk, writer)
+    return dataset, added['total_count']
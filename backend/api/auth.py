@@ -1,6 +1,66 @@
-from rest_framework.authentication import BasicAuthentication
+import hashlib
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication, BasicAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from .models import AuthToken
+
 
 class NoPopupBasicAuth(BasicAuthentication):
     def authenticate_header(self, request):
         # Prevent browser from showing its Basic Auth popup
         return ''
+
+
+def token_ttl():
+    return getattr(settings, 'AUTH_TOKEN_TTL', 7 * 86400)
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(user, name=''):
+    """Create an API token for `user`; returns `(token, AuthToken)`."""
+    token = secrets.token_urlsafe(32)
+    record = AuthToken.objects.create(
+        key=hash_token(token), user=user, name=name[:100],
+        expires_at=timezone.now() + timedelta(seconds=token_ttl()),
+    )
+    return token, record
+
+
+def purge_expired():
+    return AuthToken.objects.filter(expires_at__lt=timezone.now()).delete()[0]
+
+
+class TokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <token>` with a token from POST /api/auth/token/.
+    Tokens are random, so one indexed lookup of their sha256 stands in for
+    the PBKDF2 password check Basic auth runs on every request.
+    """
+    keywords = (b'bearer', b'token')
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() not in self.keywords:
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header.')
+        record = AuthToken.objects.select_related('user').filter(key=hash_token(token)).first()
+        if record is None or record.expires_at <= timezone.now():
+            raise AuthenticationFailed('Invalid or expired token.')
+        if not record.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return record.user, record
+
+    def authenticate_header(self, request):
+        # Not Basic: browsers show no popup for it
+        return 'Bearer'
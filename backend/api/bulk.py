@@ -0,0 +1,75 @@
+import hashlib
+import os
+import zipfile
+from collections import namedtuple
+from .dedup import content_hash
+from .storage import strip_gz
+
+BulkInput = namedtuple('BulkInput', 'name path error digest')
+
+
+class BulkUploadError(ValueError):
+    pass
+
+
+def _spool(src, path, limit=None):
+    """Copy `src` to `path`; returns the sha256 and the number of bytes copied, at most `limit`."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b''):
+            size += len(chunk)
+            if limit is not None and size > limit:
+                raise BulkUploadError('Archives inflate to too much data')
+            sha256.update(chunk)
+            dst.write(chunk)
+    return sha256.hexdigest(), size
+
+
+def collect_inputs(files, workdir, max_files, max_bytes=None):
+    """
+    Put every uploaded CSV, and every CSV inside uploaded zip archives, on
+    disk so pool workers can open them by path. Returns BulkInputs in upload
+    order; an unreadable archive becomes an input carrying an error. Archive
+    members may inflate to at most `max_bytes` in total, checked against
+    their declared sizes before anything is written and again while copying.
+    """
+    inputs = []
+    left = max_bytes
+
+    def reserve():
+        if len(inputs) >= max_files:
+            raise BulkUploadError(f'Too many files; at most {max_files} per request')
+
+    def add(name, path=None, error=None, digest=''):
+        reserve()
+        inputs.append(BulkInput(strip_gz(os.path.basename(name)), path, error, digest))
+
+    for upload in files:
+        if upload.name.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(upload)
+            except zipfile.BadZipFile as e:
+                add(upload.name, error=f'Invalid zip archive: {str(e)}')
+                continue
+            with archive:
+                for member in archive.infolist():
+                    if member.is_dir() or not member.filename.lower().endswith(('.csv', '.csv.gz')):
+                        continue
+                    reserve()
+                    if left is not None and member.file_size > left:
+                        raise BulkUploadError('Archives inflate to too much data')
+                    target = os.path.join(workdir, f'{len(inputs)}.csv')
+                    with archive.open(member) as src:
+                        digest, size = _spool(src, target, left)
+                    if left is not None:
+                        left -= size
+                    add(member.filename, target, digest=digest)
+        elif hasattr(upload, 'temporary_file_path'):
+            # Already on disk (and hashed on receipt), no need to copy
+            add(upload.name, upload.temporary_file_path(), digest=content_hash(upload))
+        else:
+            target = os.path.join(workdir, f'{len(inputs)}.csv')
+            upload.seek(0)
+            add(upload.name, target, digest=_spool(upload, target)[0])
+    return inputs
@@ -0,0 +1,88 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+ALL = 'all'
+
+
+def _version_key(scope):
+    return f'datasets:v:{scope}'
+
+
+def get_version(scope):
+    """Time of the last change in `scope`; doubles as the Last-Modified value."""
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def invalidate(user_id, *pks):
+    """Call after datasets owned by `user_id` were created, changed or deleted."""
+    now = time.time()
+    scopes = [ALL, f'user:{user_id}', *(f'ds:{pk}' for pk in pks)]
+    cache.set_many({_version_key(s): now for s in scopes}, None)
+
+
+def user_scope(user):
+    if user.is_staff or user.is_superuser:
+        return ALL
+    return f'user:{user.pk}'
+
+
+def query_key(request):
+    """Short stable key for the request's query string, for caching filtered responses."""
+    return hashlib.md5(request.GET.urlencode().encode()).hexdigest() if request.GET else ''
+
+
+def _not_modified(request, entry):
+    # Only the ETag, which is exact: If-Modified-Since has whole-second resolution and would
+    # answer 304 for a change made later within the same second
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in etags or entry['etag'] in etags
+
+
+def cached_json(request, key, scope, build, allow=None):
+    """
+    Serve the JSON produced by `build()` from the cache until `scope` is
+    invalidated, answering If-None-Match requests with 304.
+
+    `build` returns `(data, meta)` or None to skip caching (e.g. not found);
+    `allow(meta)` can veto serving a cached entry, in which case None is
+    returned and the caller should fall back to its uncached path.
+    """
+    version = get_version(scope)
+    key = f'datasets:{key}:{request.get_host()}'
+    entry = cache.get(key)
+    if entry is None or entry['version'] != version:
+        built = build()
+        if built is None:
+            return None
+        data, meta = built
+        body = JSONRenderer().render(data)
+        entry = {
+            'version': version,
+            'modified': version,
+            'etag': quote_etag(hashlib.md5(body).hexdigest()),
+            'body': body,
+            'meta': meta,
+        }
+        cache.set(key, entry, getattr(settings, 'DATASET_CACHE_TIMEOUT', 300))
+    if allow is not None and not allow(entry['meta']):
+        return None
+
+    if _not_modified(request, entry):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['modified'])
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .schema import Schema
+
+FLOAT_DTYPE = '<f8'
+CODE_DTYPE = '<i4'
+META_FILE = 'meta.json'
+
+
+def cache_root():
+    return os.fspath(getattr(settings, 'COLUMNAR_ROOT', os.path.join(settings.MEDIA_ROOT, 'columnar')))
+
+
+def cache_dir(pk):
+    return os.path.join(cache_root(), str(pk))
+
+
+class ColumnarWriter:
+    """
+    Appends parsed chunks to raw little-endian column files in a scratch
+    directory. `commit(pk)` moves the finished directory into the cache.
+    `categories` continues the category codes of an existing table, for
+    rows that `extend` appends to it.
+    """
+
+    def __init__(self, schema, categories=()):
+        os.makedirs(cache_root(), exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix='.tmp-', dir=cache_root())
+        self.numeric_cols = schema.numeric_cols
+        self.category_col = schema.category
+        self.rows = 0
+        self.present = None
+        self.has_category = False
+        self.categories = {c: code for code, c in enumerate(categories)}
+        self.files = {}
+
+    def _file(self, name):
+        if name not in self.files:
+            self.files[name] = open(os.path.join(self.path, name), 'wb')
+        return self.files[name]
+
+    def append(self, df):
+        if self.present is None:
+            self.present = [c for c in self.numeric_cols if c in df.columns]
+            self.has_category = self.category_col is not None and self.category_col in df.columns
+        for col in self.present:
+            values = df[col].to_numpy(dtype=FLOAT_DTYPE, na_value=np.nan)
+            values.tofile(self._file(f'{col}.f8'))
+        if self.has_category:
+            labels = df[self.category_col]
+            codes = np.full(len(labels), -1, dtype=CODE_DTYPE)
+            mask = labels.notna().to_numpy()
+            keys = labels[mask].astype(str).to_numpy()
+            uniques, inverse = np.unique(keys, return_inverse=True)
+            lookup = np.array([self.categories.setdefault(u, len(self.categories)) for u in uniques], dtype=CODE_DTYPE)
+            codes[mask] = lookup[inverse]
+            codes.tofile(self._file(f'{self.category_col}.codes.i4'))
+        self.rows += len(df)
+
+    def finish(self):
+        """Close the column files and return the finished scratch table."""
+        for f in self.files.values():
+            f.close()
+        meta = {
+            'rows': self.rows,
+            'numeric': self.present or [],
+            'category': self.category_col if self.has_category else None,
+            'categories': list(self.categories),
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+        return ColumnarTable(self.path)
+
+    def commit(self, pk):
+        if not os.path.exists(os.path.join(self.path, META_FILE)):
+            self.finish()
+        return commit_dir(self.path, pk)
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ColumnarTable:
+    """Memory-mapped view of a cached dataset."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.category = meta['category']
+        self.categories = meta['categories']
+        self.columns = {col: self._map(path, f'{col}.f8', FLOAT_DTYPE) for col in meta['numeric']}
+        self.codes = self._map(path, f'{self.category}.codes.i4', CODE_DTYPE) if self.category else None
+
+    def _map(self, path, name, dtype):
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(path, name), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def frame(self, columns=None):
+        data = {col: values for col, values in self.columns.items() if columns is None or col in columns}
+        if self.category and (columns is None or self.category in columns):
+            data[self.category] = pd.Categorical.from_codes(self.codes, categories=self.categories)
+        return pd.DataFrame(data)
+
+
+def commit_dir(path, pk):
+    """Move a finished scratch directory (see ColumnarWriter.finish) into place for `pk`."""
+    target = cache_dir(pk)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(path, target)
+    return target
+
+
+def load(pk):
+    path = cache_dir(pk)
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    return ColumnarTable(path)
+
+
+def link(source_pk, pk):
+    """Share the cache of `source_pk` with `pk` (same content) via hard links; no-op without one."""
+    source = cache_dir(source_pk)
+    if not os.path.exists(os.path.join(source, META_FILE)):
+        return None
+    os.makedirs(cache_root(), exist_ok=True)
+    path = tempfile.mkdtemp(prefix='.tmp-', dir=cache_root())
+    try:
+        for entry in os.scandir(source):
+            try:
+                os.link(entry.path, os.path.join(path, entry.name))
+            except OSError:
+                shutil.copyfile(entry.path, os.path.join(path, entry.name))
+    except Exception:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return commit_dir(path, pk)
+
+
+def _unshare(path):
+    # Hard-linked with a deduplicated dataset's cache: copy before writing
+    if os.stat(path).st_nlink > 1:
+        tmp = f'{path}.tmp'
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, path)
+
+
+def extend(pk, writer):
+    """
+    Append the rows of `writer` (see ColumnarWriter's `categories`) to the
+    cache of `pk`, copying only the new bytes. Files are first cut back to
+    the committed row count and meta.json is replaced last, so a failed
+    append leaves the cache as it was. Drops the cache (it is rebuilt on
+    demand) when the new rows don't have the same columns.
+    """
+    target = cache_dir(pk)
+    added = writer.finish()
+    try:
+        with open(os.path.join(target, META_FILE)) as f:
+            meta = json.load(f)
+        if list(added.columns) != meta['numeric'] or added.category != meta['category']:
+            delete(pk)
+            return None
+        files = [(f'{col}.f8', FLOAT_DTYPE) for col in meta['numeric']]
+        if meta['category']:
+            files.append((f"{meta['category']}.codes.i4", CODE_DTYPE))
+        for name, dtype in files:
+            path = os.path.join(target, name)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            _unshare(path)
+            with open(path, 'r+b') as out:
+                out.truncate(meta['rows'] * np.dtype(dtype).itemsize)
+                out.seek(0, os.SEEK_END)
+                if added.rows:
+                    with open(os.path.join(writer.path, name), 'rb') as src:
+                        shutil.copyfileobj(src, out)
+        meta.update(rows=meta['rows'] + added.rows, categories=added.categories)
+        tmp = os.path.join(target, f'{META_FILE}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(target, META_FILE))
+    finally:
+        shutil.rmtree(writer.path, ignore_errors=True)
+    return target
+
+
+def delete(pk):
+    shutil.rmtree(cache_dir(pk), ignore_errors=True)
+
+
+def table_for(dataset):
+    """
+    Columnar table of `dataset`, building the cache from the stored CSV for
+    datasets uploaded before the cache existed.
+    """
+    table = load(dataset.pk)
+    if table is None:
+        from .ingest import summarize_csv
+        schema = Schema.from_dict(dataset.schema)
+        writer = ColumnarWriter(schema)
+        try:
+            with dataset.file.open('rb') as f:
+                summarize_csv(f, sink=writer, schema=schema)
+            writer.commit(dataset.pk)
+        except Exception:
+            writer.abort()
+            raise
+        table = load(dataset.pk)
+    return table
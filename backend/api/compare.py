@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from . import columnar
+from .append import fresh_stats
+from .rows import json_values
+from .stats import compute_stats
+
+STAT_KEYS = ('count', 'mean', 'std', 'min', 'max', 'p50', 'p95', 'p99')
+
+
+def _ordered_union(lists):
+    seen = {}
+    for items in lists:
+        for item in items:
+            seen.setdefault(item, None)
+    return list(seen)
+
+
+def dataset_stats(dataset):
+    """Stored extended stats, computed from the columnar cache for summaries that predate them."""
+    stats = fresh_stats(dataset)
+    if stats is None:
+        stats = compute_stats(columnar.table_for(dataset))
+    return stats
+
+
+def _aligned(frames, index, columns, fill_value=np.nan):
+    """(len(frames), len(index), len(columns)) array of the frames reindexed onto the same labels."""
+    return np.stack([f.reindex(index=index, columns=columns, fill_value=fill_value).to_numpy(dtype=float) for f in frames])
+
+
+def _frames(stats):
+    """
+    One dataset's stats as frames: column stats (columns x STAT_KEYS),
+    per-Type row counts (Types x 1) and per-Type means (Types x columns).
+    """
+    column_stats = pd.DataFrame(stats['columns'], index=list(STAT_KEYS), dtype=float).T
+    columns, types, groups = list(stats['columns']), list(stats['by_type']), stats['by_type'].values()
+    counts = pd.DataFrame({'count': [g['count'] for g in groups]}, index=types, dtype=float)
+    means = pd.DataFrame([[(g.get(c) or {}).get('mean') for c in columns] for g in groups],
+                         index=types, columns=columns, dtype=float)
+    return column_stats, counts, means
+
+
+def _matrix(grid):
+    return [json_values(row) for row in grid]
+
+
+def compare(datasets, baseline=0):
+    """
+    Per-column statistics and per-Type aggregates of several datasets,
+    aligned on the union of their columns and Types (null where a dataset
+    lacks one), with deltas against `datasets[baseline]`. Each dataset's
+    stats are reindexed onto the unions into one array per measure, so
+    every delta is one broadcast subtraction.
+    """
+    stats = [dataset_stats(d) for d in datasets]
+    columns = _ordered_union(s['columns'] for s in stats)
+    types = _ordered_union(s['by_type'] for s in stats)
+
+    column_frames, count_frames, mean_frames = zip(*map(_frames, stats))
+    col_grid = _aligned(column_frames, columns, list(STAT_KEYS))
+    # A Type missing from a dataset has zero rows there
+    type_counts = _aligned(count_frames, types, ['count'], fill_value=0)[:, :, 0]
+    type_means = _aligned(mean_frames, types, columns)
+
+    col_deltas = col_grid - col_grid[baseline]
+    count_deltas = type_counts - type_counts[baseline]
+    mean_deltas = type_means - type_means[baseline]
+    return {
+        'datasets': [{'id': d.pk, 'uploaded_at': d.uploaded_at, 'file': d.file.name} for d in datasets],
+        'baseline': datasets[baseline].pk,
+        'columns': columns,
+        'types': types,
+        'column_stats': {k: _matrix(col_grid[:, :, j]) for j, k in enumerate(STAT_KEYS)},
+        'column_deltas': {k: _matrix(col_deltas[:, :, j]) for j, k in enumerate(STAT_KEYS)},
+        'type_counts': _matrix(type_counts),
+        'type_count_deltas': _matrix(count_deltas),
+        'type_means': {c: _matrix(type_means[:, :, j]) for j, c in enumerate(columns)},
+        'type_mean_deltas': {c: _matrix(mean_deltas[:, :, j]) for j, c in enumerate(columns)},
+    }
+
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` rows of a 2-D array, skipping NaNs (NaN when a window has none)."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def trend(history, window):
+    """
+    Per-upload averages and their trailing rolling mean over `history`, a
+    sequence of `(id, uploaded_at, total_count, averages)` oldest first,
+    as read straight from stored summaries.
+    """
+    columns = _ordered_union((averages or {}) for _, _, _, averages in history)
+    values = np.full((len(history), len(columns)), np.nan)
+    for d, (_, _, _, averages) in enumerate(history):
+        for j, column in enumerate(columns):
+            value = (averages or {}).get(column)
+            if value is not None:
+                values[d, j] = value
+    rolling = rolling_mean(values, window) if len(history) else values
+    return {
+        'window': window,
+        'columns': columns,
+        'datasets': [
+            {'id': pk, 'uploaded_at': uploaded_at, 'total_count': total_count}
+            for pk, uploaded_at, total_count, _ in history
+        ],
+        'averages': {c: json_values(values[:, j]) for j, c in enumerate(columns)},
+        'rolling': {c: json_values(rolling[:, j]) for j, c in enumerate(columns)},
+    }
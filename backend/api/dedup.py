@@ -0,0 +1,99 @@
+import hashlib
+import logging
+from collections import Counter
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db.models import Case, F, When
+from . import columnar
+from .models import Blob, Dataset
+
+logger = logging.getLogger(__name__)
+
+
+class HashingMixin:
+    """Hashes an upload as Django receives it and sets `content_hash` on the resulting file."""
+
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler ends new_file by raising StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        if f is not None:
+            f.content_hash = self.sha256.hexdigest()
+        return f
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def content_hash(f, block=1024 * 1024):
+    """sha256 of an upload, read from the upload handler when it already hashed it."""
+    digest = getattr(f, 'content_hash', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(block), b''):
+        sha256.update(chunk)
+    f.seek(0)
+    return sha256.hexdigest()
+
+
+def reuse(digest, schema_dict, user):
+    """
+    On a content-hash hit among `user`'s own datasets, create another one
+    pointing at the existing blob with the summary and columnar cache
+    already computed for the same content and schema; returns None on a
+    miss. A hit costs a lookup, a reference increment and an insert. Other
+    users' uploads never match: the copy would share their file's name and
+    URL, and the hit would tell whether someone uploaded the same bytes.
+    """
+    source = (
+        Dataset.objects.filter(
+            uploaded_by=user, content_hash=digest, schema=schema_dict, status=Dataset.STATUS_READY,
+            blob__isnull=False,
+        )
+        .order_by('-uploaded_at')
+        .first()
+    )
+    # The increment fails if the blob's last reference went away meanwhile
+    if source is None or not Blob.objects.filter(pk=source.blob_id).update(refs=F('refs') + 1):
+        return None
+    dataset = Dataset.objects.create(
+        file=source.file.name, size=source.size, summary=source.summary, schema=schema_dict,
+        content_hash=digest, blob_id=source.blob_id, uploaded_by=user,
+    )
+    columnar.link(source.pk, dataset.pk)
+    return dataset
+
+
+def release(blob_ids):
+    """Drop one reference per occurrence in `blob_ids`, all in one UPDATE."""
+    counts = Counter(b for b in blob_ids if b is not None)
+    if counts:
+        Blob.objects.filter(pk__in=counts).update(
+            refs=Case(*(When(pk=b, then=F('refs') - n) for b, n in counts.items()), default=F('refs'))
+        )
+
+
+def collect(blob_id):
+    """
+    Delete an unreferenced blob's row and return its name so the caller can
+    remove the file; None while it is still referenced. Deleting the row
+    first means a concurrent `reuse` either got its reference in before
+    (and the blob stays) or misses.
+    """
+    blob = Blob.objects.filter(pk=blob_id, refs__lte=0).first()
+    if blob is None or not Blob.objects.filter(pk=blob_id, refs__lte=0).delete()[0]:
+        return None
+    return blob.name
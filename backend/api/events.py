@@ -0,0 +1,261 @@
+"""
+Per-user stream of dataset changes as server-sent events.
+
+Changes are recorded as DatasetEvent rows next to the change itself, so
+every process (request workers, the upload pool, the prune command) can
+announce them. Under ASGI each server process runs one
+Broker that polls for new rows and fans them out to all of its idle
+subscribers: one query per poll interval however many clients are
+connected. Events published by the same process wake it up immediately.
+Publishing also trims events older than EVENT_RETENTION, at most once per
+TRIM_INTERVAL per process, on the retention sweeper thread.
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from .models import Dataset, DatasetEvent
+
+CREATED = DatasetEvent.KIND_CREATED
+PROCESSED = DatasetEvent.KIND_PROCESSED
+UPDATED = DatasetEvent.KIND_UPDATED
+DELETED = DatasetEvent.KIND_DELETED
+
+BATCH_SIZE = 500
+# Events a subscriber may have queued before it is dropped (and reconnects to replay)
+QUEUE_SIZE = 1000
+RETRY_MS = 3000
+TRIM_INTERVAL = 3600
+
+logger = logging.getLogger(__name__)
+
+
+def poll_interval():
+    return getattr(settings, 'EVENT_POLL_INTERVAL', 1.0)
+
+
+def keepalive_interval():
+    return getattr(settings, 'EVENT_KEEPALIVE', 15)
+
+
+def publish(kind, entries):
+    """Record `kind` for every `(dataset pk, owner id)` in `entries`."""
+    events = [DatasetEvent(dataset_id=pk, user_id=owner_id, kind=kind) for pk, owner_id in entries]
+    if events:
+        DatasetEvent.objects.bulk_create(events)
+        transaction.on_commit(_wake_brokers)
+        transaction.on_commit(_schedule_trim)
+
+
+def trim(max_age=None):
+    """Delete events older than `max_age` seconds (EVENT_RETENTION, default a day)."""
+    max_age = getattr(settings, 'EVENT_RETENTION', 86400) if max_age is None else max_age
+    return DatasetEvent.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=max_age)).delete()[0]
+
+
+_last_trim = None
+_trim_lock = threading.Lock()
+
+
+def _schedule_trim():
+    global _last_trim
+    now = time.monotonic()
+    with _trim_lock:
+        if _last_trim is not None and now - _last_trim < TRIM_INTERVAL:
+            return
+        _last_trim = now
+    from .retention import get_sweeper
+    get_sweeper().submit(_trim_in_background)
+
+
+def _trim_in_background():
+    close_old_connections()
+    try:
+        trim()
+    except Exception:
+        logger.exception('Trimming dataset events failed')
+    finally:
+        connections.close_all()
+
+
+def fetch(after, user_id=None, limit=BATCH_SIZE):
+    """
+    Events after id `after` (only `user_id`'s when given), oldest first, as
+    `(id, owner id, kind, JSON body)`. The body carries the dataset as it
+    is now, summary included, or just its id once it is gone.
+    """
+    from .serializers import DatasetSerializer
+
+    qs = DatasetEvent.objects.filter(pk__gt=after)
+    if user_id is not None:
+        qs = qs.filter(user_id=user_id)
+    events = list(qs.order_by('pk').values_list('pk', 'user_id', 'dataset_id', 'kind')[:limit])
+    live = Dataset.objects.select_related('uploaded_by').in_bulk(
+        {dataset_id for _, _, dataset_id, kind in events if kind != DELETED}
+    )
+    renderer = JSONRenderer()
+    result = []
+    for pk, owner_id, dataset_id, kind in events:
+        data = {'id': dataset_id}
+        if dataset_id in live:
+            data['dataset'] = DatasetSerializer(live[dataset_id]).data
+        result.append((pk, owner_id, kind, renderer.render(data).decode()))
+    return result
+
+
+def latest_id():
+    return DatasetEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def format_event(event):
+    pk, _, kind, body = event
+    return f'id: {pk}\nevent: {kind}\ndata: {body}\n\n'
+
+
+class Subscriber:
+    def __init__(self, user_id):
+        # None: an admin, who sees everyone's datasets
+        self.user_id = user_id
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, event):
+        if self.user_id is not None and event[1] != self.user_id:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+    """Polls for new events on behalf of every subscriber on one event loop, while there are any."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.wake = asyncio.Event()
+        self.task = None
+        self.last = None
+
+    def subscribe(self, subscriber):
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def run(self):
+        try:
+            self.last = await sync_to_async(latest_id)()
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), poll_interval())
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                try:
+                    batch = await sync_to_async(fetch)(self.last)
+                except Exception:
+                    logger.exception('Polling dataset events failed')
+                    continue
+                for event in batch:
+                    for subscriber in self.subscribers:
+                        subscriber.offer(event)
+                if batch:
+                    self.last = batch[-1][0]
+                if len(batch) == BATCH_SIZE:
+                    self.wake.set()
+        finally:
+            self.task = None
+
+
+_brokers = weakref.WeakKeyDictionary()
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    loop = asyncio.get_running_loop()
+    with _brokers_lock:
+        if loop not in _brokers:
+            _brokers[loop] = Broker()
+        return _brokers[loop]
+
+
+def _wake_brokers():
+    with _brokers_lock:
+        brokers = list(_brokers.items())
+    for loop, broker in brokers:
+        try:
+            loop.call_soon_threadsafe(broker.wake.set)
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+
+def _scope(user):
+    return None if user.is_staff or user.is_superuser else user.pk
+
+
+async def stream(user, last_event_id=None):
+    """
+    Async SSE body for `user`: replays what came after `last_event_id`
+    (a reconnecting client's Last-Event-ID), then follows the broker.
+    Comments keep idle connections open through proxies.
+    """
+    subscriber = Subscriber(_scope(user))
+    broker = get_broker()
+    broker.subscribe(subscriber)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        last = 0
+        if last_event_id is not None:
+            last = last_event_id
+            while True:
+                batch = await sync_to_async(fetch)(last, subscriber.user_id)
+                for event in batch:
+                    last = event[0]
+                    yield format_event(event)
+                if len(batch) < BATCH_SIZE:
+                    break
+        while not subscriber.overflowed:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), keepalive_interval())
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event[0] > last:
+                last = event[0]
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def stream_sync(user, last_event_id=None):
+    """
+    The same stream for WSGI servers (e.g. runserver), which hold a thread
+    per connection anyway: each connection polls for its own events.
+    """
+    user_id = _scope(user)
+    last = latest_id() if last_event_id is None else last_event_id
+    yield f'retry: {RETRY_MS}\n\n'
+    idle = 0.0
+    while True:
+        batch = fetch(last, user_id)
+        for event in batch:
+            last = event[0]
+            yield format_event(event)
+        if batch:
+            idle = 0.0
+        elif idle >= keepalive_interval():
+            idle = 0.0
+            yield ': keepalive\n\n'
+        time.sleep(poll_interval())
+        idle += poll_interval()
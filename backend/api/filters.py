@@ -0,0 +1,42 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def _parse_when(name, value, end_of_day=False):
+    day = parse_date(value)
+    if day is not None:
+        when = datetime.combine(day, time.max if end_of_day else time.min)
+    else:
+        when = parse_datetime(value)
+        if when is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return when
+
+
+def filter_datasets(queryset, params):
+    """
+    Narrow a Dataset queryset by the list query parameters:
+
+    - `user`: owner's username
+    - `uploaded_after` / `uploaded_before`: ISO dates or datetimes (inclusive;
+      a bare `uploaded_before` date covers that whole day)
+    - `type`: comma-separated equipment Types, matching datasets whose
+      type distribution contains any of them
+    - `status`: comma-separated processing states
+    """
+    if params.get('user'):
+        queryset = queryset.filter(uploaded_by__username=params['user'])
+    if params.get('uploaded_after'):
+        queryset = queryset.filter(uploaded_at__gte=_parse_when('uploaded_after', params['uploaded_after']))
+    if params.get('uploaded_before'):
+        queryset = queryset.filter(uploaded_at__lte=_parse_when('uploaded_before', params['uploaded_before'], end_of_day=True))
+    if params.get('type'):
+        types = [t for t in params['type'].split(',') if t]
+        queryset = queryset.filter(summary__type_distribution__has_any_keys=types)
+    if params.get('status'):
+        queryset = queryset.filter(status__in=params['status'].split(','))
+    return queryset
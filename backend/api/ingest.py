@@ -0,0 +1,185 @@
+import gzip
+from collections import Counter
+import pandas as pd
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from .schema import Schema, SchemaError
+from .storage import compress_level, is_gzip, strip_gz
+
+CHUNK_ROWS = 50_000
+
+
+class TeeReader:
+    """File-like wrapper that copies every byte read into `sink`."""
+
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+        # Last byte copied, so callers can tell whether the copy ends a line
+        self.tail = b''
+
+    def read(self, size=-1):
+        data = self.source.read(size)
+        if data:
+            self.sink.write(data)
+            self.tail = data[-1:]
+        return data
+
+    def drain(self, block=1024 * 1024):
+        while self.read(block):
+            pass
+
+    def __iter__(self):
+        # pandas only treats objects with read() and __iter__ as file handles
+        return self
+
+    def __next__(self):
+        line = self.source.readline()
+        if not line:
+            raise StopIteration
+        self.sink.write(line)
+        self.tail = line[-1:]
+        return line
+
+
+class SummaryAccumulator:
+    """
+    Running count/sum/sum-of-squares per column and row counts per Type.
+    These merge by addition, so a stored summary (see `from_summary`) can
+    be extended with new rows without reading the old ones again.
+    """
+
+    def __init__(self, schema):
+        self.numeric_cols = schema.numeric_cols
+        self.category = schema.category
+        self.units = schema.units
+        self.total_count = 0
+        self.sums = dict.fromkeys(self.numeric_cols, 0.0)
+        self.squares = dict.fromkeys(self.numeric_cols, 0.0)
+        self.counts = dict.fromkeys(self.numeric_cols, 0)
+        self.seen = set()
+        self.types = Counter()
+
+    @classmethod
+    def from_summary(cls, schema, summary, aggregates):
+        """Resume from a stored summary and its `aggregates` (as `summary()` writes them)."""
+        acc = cls(schema)
+        acc.total_count = summary.get('total_count', 0)
+        acc.types.update(summary.get('type_distribution') or {})
+        for col, count in aggregates['count'].items():
+            if col in acc.counts:
+                acc.seen.add(col)
+                acc.counts[col] = count
+                acc.sums[col] = aggregates['sum'][col]
+                acc.squares[col] = aggregates['sumsq'][col]
+        return acc
+
+    def merge(self, other):
+        self.total_count += other.total_count
+        self.types.update(other.types)
+        self.seen |= other.seen
+        for col in self.numeric_cols:
+            self.counts[col] += other.counts[col]
+            self.sums[col] += other.sums[col]
+            self.squares[col] += other.squares[col]
+
+    def update(self, df):
+        # Columns arrive already typed by the parser, so no per-column coercion here
+        self.total_count += len(df)
+        for col in self.numeric_cols:
+            if col not in df.columns:
+                continue
+            self.seen.add(col)
+            values = df[col]
+            self.sums[col] += float(values.sum())
+            self.squares[col] += float((values.astype('float64') ** 2).sum())
+            self.counts[col] += int(values.count())
+        if self.category in df.columns:
+            self.types.update(df[self.category].value_counts().to_dict())
+
+    def averages(self):
+        averages = {}
+        for col in self.numeric_cols:
+            if col not in self.seen or not self.counts[col]:
+                averages[col] = None
+            else:
+                averages[col] = self.sums[col] / self.counts[col]
+        return averages
+
+    def summary(self):
+        summary = {
+            'total_count': int(self.total_count),
+            'averages': self.averages(),
+            'type_distribution': {str(k): int(v) for k, v in self.types.most_common() if v},
+            'aggregates': {
+                'count': {c: self.counts[c] for c in self.numeric_cols if c in self.seen},
+                'sum': {c: self.sums[c] for c in self.numeric_cols if c in self.seen},
+                'sumsq': {c: self.squares[c] for c in self.numeric_cols if c in self.seen},
+            },
+        }
+        if self.units:
+            summary['units'] = self.units
+        return summary
+
+
+def summarize_csv(csv_file, chunksize=CHUNK_ROWS, sink=None, schema=None, names=None):
+    """
+    Summarize `csv_file` chunk by chunk, forwarding each chunk to `sink.append`
+    if given. Only the columns of `schema` are parsed, with their declared
+    dtypes; values that do not fit raise SchemaError. `names` gives the
+    header of a file that has none (e.g. rows appended to a dataset).
+    """
+    schema = schema or Schema.from_dict(None)
+    acc = SummaryAccumulator(schema)
+    kwargs = schema.read_csv_kwargs()
+    if names is not None:
+        kwargs.update(header=None, names=names)
+    try:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, **kwargs):
+            acc.update(chunk)
+            if sink is not None:
+                sink.append(chunk)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError):
+        raise
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f'Data does not match schema: {str(e)}') from e
+    return acc.summary()
+
+
+def copy_compressed(csv_file, out, chunksize=CHUNK_ROWS, sink=None, schema=None):
+    """
+    Summarize `csv_file` (see summarize_csv) while writing it gzip-compressed
+    to the binary file `out`, in the same pass. A gzipped upload (.csv.gz)
+    is inflated in memory as it is parsed and its bytes are copied as they are.
+    """
+    csv_file.seek(0)
+    if is_gzip(csv_file):
+        tee = TeeReader(csv_file, out)
+        summary = summarize_csv(gzip.GzipFile(fileobj=tee, mode='rb'), chunksize, sink, schema)
+        tee.drain()
+    else:
+        with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compress_level(), mtime=0) as gz:
+            tee = TeeReader(csv_file, gz)
+            summary = summarize_csv(tee, chunksize, sink, schema)
+            tee.drain()
+    return summary
+
+
+def ingest_csv(csv_file, chunksize=CHUNK_ROWS, sink=None, schema=None):
+    """
+    Parse `csv_file` in bounded chunks while copying it, compressed, to a
+    temporary file.
+
+    Returns `(stored, summary)`; `stored` is a TemporaryUploadedFile that
+    the storage moves into place instead of copying. Raises the
+    pandas/parsing error unchanged so the view can report it.
+    """
+    stored = TemporaryUploadedFile(strip_gz(csv_file.name), 'application/gzip', 0, None)
+    try:
+        summary = copy_compressed(csv_file, stored.file, chunksize, sink, schema)
+        stored.file.flush()
+        stored.size = stored.file.tell()
+        stored.seek(0)
+    except Exception:
+        stored.close()
+        raise
+    return stored, summary
@@ -0,0 +1,226 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import repeat
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def enabled():
+    return getattr(settings, 'UPLOAD_WORKERS', 0) > 0
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.UPLOAD_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return _executor
+
+
+def _discard_broken_executor():
+    # A worker died and the pool refuses new work; the next upload starts a fresh one
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor._broken:
+            _executor = None
+
+
+def process_dataset(pk):
+    """Runs in a pool worker: summarize the stored CSV of a pending dataset."""
+    from . import cache, events, reports
+    from .columnar import ColumnarWriter, delete as delete_cache
+    from .ingest import summarize_csv
+    from .models import Dataset
+    from .schema import Schema
+    from .stats import compute_stats
+
+    close_old_connections()
+    try:
+        claimed = Dataset.objects.filter(pk=pk, status=Dataset.STATUS_PENDING).update(status=Dataset.STATUS_PROCESSING)
+        if not claimed:
+            # Pruned or already picked up before the worker got to it
+            return None
+        dataset = Dataset.objects.get(pk=pk)
+        cache.invalidate(dataset.uploaded_by_id, pk)
+        schema = Schema.from_dict(dataset.schema)
+        writer = ColumnarWriter(schema)
+        try:
+            with dataset.file.open('rb') as f:
+                summary = summarize_csv(f, sink=writer, schema=schema)
+            summary['stats'] = compute_stats(writer.finish())
+        except Exception as e:
+            writer.abort()
+            Dataset.objects.filter(pk=pk).update(status=Dataset.STATUS_FAILED, error=f'Error reading CSV: {str(e)}')
+            events.publish(events.PROCESSED, [(pk, dataset.uploaded_by_id)])
+            cache.invalidate(dataset.uploaded_by_id, pk)
+            return Dataset.STATUS_FAILED
+        writer.commit(pk)
+        size = dataset.size
+        storage = dataset.file.storage
+        if hasattr(storage, 'compress_stored'):
+            # Stored as uploaded to keep the request fast; compress it here
+            size = storage.compress_stored(dataset.file.name)
+        if not Dataset.objects.filter(pk=pk).update(status=Dataset.STATUS_READY, summary=summary, error='', size=size):
+            # Pruned while we were parsing
+            delete_cache(pk)
+            return None
+        events.publish(events.PROCESSED, [(pk, dataset.uploaded_by_id)])
+        cache.invalidate(dataset.uploaded_by_id, pk)
+        if getattr(settings, 'PRERENDER_REPORTS', False):
+            dataset.refresh_from_db()
+            reports.build_report(dataset)
+        return Dataset.STATUS_READY
+    finally:
+        connections.close_all()
+
+
+def _on_done(pk, future):
+    from . import cache, events
+    from .models import Dataset
+
+    exc = future.exception()
+    if exc is None:
+        return
+    if isinstance(exc, BrokenProcessPool):
+        _discard_broken_executor()
+    logger.error('Processing dataset %s failed: %r', pk, exc)
+    try:
+        owner_id = Dataset.objects.filter(pk=pk).values_list('uploaded_by_id', flat=True).first()
+        if Dataset.objects.filter(pk=pk).exclude(status=Dataset.STATUS_READY).update(
+            status=Dataset.STATUS_FAILED, error=f'Processing failed: {exc!r}'
+        ):
+            events.publish(events.PROCESSED, [(pk, owner_id)])
+        cache.invalidate(owner_id, pk)
+    finally:
+        connections.close_all()
+
+
+def enqueue(pk):
+    future = get_executor().submit(process_dataset, pk)
+    future.add_done_callback(partial(_on_done, pk))
+    return future
+
+
+def shutdown():
+    """Stop the worker pool of this process, e.g. once a management command is done with it."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def recover(fail=False):
+    """
+    Datasets left pending or processing by a restart or a worker that died:
+    back to pending and processed again (on the pool when enabled, and
+    waited for), or with `fail` marked failed. Only run it while no other
+    process is working on uploads, e.g. before the server starts. Returns
+    `{pk: status}`.
+    """
+    from . import cache, events
+    from .models import Dataset
+
+    stuck = list(Dataset.objects.filter(
+        status__in=(Dataset.STATUS_PENDING, Dataset.STATUS_PROCESSING)
+    ).values_list('pk', 'uploaded_by_id'))
+    pks = [pk for pk, _ in stuck]
+    if fail:
+        Dataset.objects.filter(pk__in=pks).update(status=Dataset.STATUS_FAILED, error='Processing was interrupted')
+        events.publish(events.PROCESSED, stuck)
+        for pk, owner_id in stuck:
+            cache.invalidate(owner_id, pk)
+        return dict.fromkeys(pks, Dataset.STATUS_FAILED)
+
+    Dataset.objects.filter(pk__in=pks, status=Dataset.STATUS_PROCESSING).update(status=Dataset.STATUS_PENDING)
+    if enabled():
+        futures = {pk: get_executor().submit(process_dataset, pk) for pk in pks}
+        for pk, future in futures.items():
+            # Marks crashed jobs failed; as a done callback it could still be running after a wait()
+            wait([future])
+            _on_done(pk, future)
+    else:
+        for pk in pks:
+            process_dataset(pk)
+    return dict(Dataset.objects.filter(pk__in=pks).values_list('pk', 'status'))
+
+
+def render_report(pk):
+    """Runs in a pool worker: render the PDF report of a dataset into the report cache."""
+    from . import reports
+    from .models import Dataset
+
+    close_old_connections()
+    try:
+        return reports.build_report(Dataset.objects.get(pk=pk))
+    finally:
+        connections.close_all()
+
+
+def build_report(dataset):
+    """Render one report, off the request thread's interpreter when the pool is enabled."""
+    from . import reports
+
+    if enabled():
+        try:
+            return get_executor().submit(render_report, dataset.pk).result()
+        except BrokenProcessPool:
+            _discard_broken_executor()
+    return reports.build_report(dataset)
+
+
+def build_reports(datasets):
+    """Render several reports in parallel across the worker pool."""
+    from . import reports
+
+    if not enabled():
+        return [reports.build_report(d) for d in datasets]
+    return list(get_executor().map(render_report, [d.pk for d in datasets]))
+
+
+def ingest_path(path, out_path, schema_dict):
+    """
+    Runs in a pool worker (or inline): summarize one CSV (or .csv.gz) on disk,
+    writing it compressed to `out_path` and its columnar cache to a scratch
+    directory, both for the caller to commit.
+    """
+    from .columnar import ColumnarWriter
+    from .ingest import copy_compressed
+    from .schema import Schema
+    from .stats import compute_stats
+
+    schema = Schema.from_dict(schema_dict)
+    writer = ColumnarWriter(schema)
+    try:
+        with open(path, 'rb') as f, open(out_path, 'wb') as out:
+            summary = copy_compressed(f, out, sink=writer, schema=schema)
+        summary['stats'] = compute_stats(writer.finish())
+    except Exception as e:
+        writer.abort()
+        return {'error': f'Error reading CSV: {str(e)}'}
+    return {'summary': summary, 'cache': writer.path, 'stored': out_path}
+
+
+def ingest_paths(paths, out_paths, schema_dict):
+    """Parse several CSVs in parallel across the worker pool."""
+    if not enabled():
+        return [ingest_path(p, o, schema_dict) for p, o in zip(paths, out_paths)]
+    return list(get_executor().map(ingest_path, paths, out_paths, repeat(schema_dict)))
@@ -0,0 +1,45 @@
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from api import auth, cache, events, retention
+
+
+class Command(BaseCommand):
+    help = 'Apply the DATASET_RETENTION policy, sweep files no dataset refers to, trim old dataset events and delete expired API tokens.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='usernames', metavar='USERNAME',
+                            help='Only prune these users (repeatable); default is everyone.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without deleting.')
+        parser.add_argument('--no-orphans', action='store_true', help='Skip the orphaned file sweep.')
+        parser.add_argument('--orphan-age', type=int, default=3600,
+                            help='Only sweep orphaned files untouched for this many seconds (default 3600).')
+
+    def handle(self, *args, **options):
+        users = None
+        if options['usernames']:
+            users = list(User.objects.filter(username__in=options['usernames']))
+            missing = set(options['usernames']) - {u.username for u in users}
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        if options['dry_run']:
+            pks = list(retention.expired(users).values_list('pk', flat=True))
+            self.stdout.write(f'Would prune {len(pks)} dataset(s): {pks}')
+        else:
+            pruned = retention.prune(users, sweep=False)
+            by_owner = defaultdict(list)
+            for pk, owner_id in pruned:
+                by_owner[owner_id].append(pk)
+            for owner_id, pks in by_owner.items():
+                cache.invalidate(owner_id, *pks)
+            self.stdout.write(f'Pruned {len(pruned)} dataset(s)')
+            self.stdout.write(f'Trimmed {events.trim()} old dataset event(s)')
+            self.stdout.write(f'Deleted {auth.purge_expired()} expired API token(s)')
+
+        if not options['no_orphans']:
+            orphans = retention.sweep_orphans(options['orphan_age'], dry_run=options['dry_run'])
+            verb = 'Would remove' if options['dry_run'] else 'Removed'
+            self.stdout.write(f'{verb} {len(orphans)} orphaned file(s)')
+            for path in orphans:
+                self.stdout.write(f'  {path}', style_func=None)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from api import jobs
+
+
+class Command(BaseCommand):
+    help = ('Process uploads left pending or processing by a restart or a crashed worker, or mark them failed. '
+            'Run it while no server is handling uploads, e.g. before starting one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail', action='store_true', help='Mark them failed instead of processing them again.')
+
+    def handle(self, *args, **options):
+        try:
+            recovered = jobs.recover(fail=options['fail'])
+        finally:
+            jobs.shutdown()
+        for pk, status in sorted(recovered.items()):
+            self.stdout.write(f'  dataset {pk}: {status}', style_func=None)
+        self.stdout.write(f'Recovered {len(recovered)} interrupted upload(s)')
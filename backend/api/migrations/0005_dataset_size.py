@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def backfill_size(apps, schema_editor):
+    Dataset = apps.get_model('api', 'Dataset')
+    for dataset in Dataset.objects.only('pk', 'file').iterator():
+        try:
+            size = dataset.file.size
+        except (OSError, ValueError):
+            continue
+        Dataset.objects.filter(pk=dataset.pk).update(size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_dataset_schema_columnschema'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_size, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_dataset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='dataset',
+            name='dataset_owner_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='dataset',
+            name='dataset_recent_idx',
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['uploaded_by', '-uploaded_at', '-id'], name='dataset_owner_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dataset',
+            index=models.Index(fields=['-uploaded_at', '-id'], name='dataset_history_idx'),
+        ),
+    ]
@@ -1,12 +1,116 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+
+class Blob(models.Model):
+    """
+    A stored upload shared by every dataset with the same content. `refs`
+    counts those datasets; the file is only deleted once it drops to zero
+    (see api.dedup).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.IntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Blob {self.name} ({self.refs} refs)"
+
+
 class Dataset(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_READY, 'Ready'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     file = models.FileField(upload_to='datasets/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     summary = models.JSONField(null=True, blank=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='datasets', null=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_READY)
+    error = models.TextField(blank=True, default='')
+    schema = models.JSONField(null=True, blank=True)
+    # Bytes of the stored (compressed) file, counted against the retention byte budget
+    size = models.BigIntegerField(default=0)
+    # sha256 of the bytes as uploaded; the owner's identical re-uploads share `blob` and reuse the summary
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, related_name='datasets', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Per-user history: list/detail filter on the owner and order newest first
+            models.Index(fields=['uploaded_by', '-uploaded_at', '-id'], name='dataset_owner_history_idx'),
+            # Keyset pagination walks (-uploaded_at, -id)
+            models.Index(fields=['-uploaded_at', '-id'], name='dataset_history_idx'),
+        ]
+
+    def store_file(self):
+        """
+        Write a pending upload to storage now, so `size` is what actually
+        landed on disk, and register it as a blob later uploads can share.
+        """
+        if self.file and not self.file._committed:
+            self.file.save(self.file.name, self.file.file, save=False)
+            self.size = self.file.size
+            self.blob = Blob.objects.create(name=self.file.name)
+
+    def save(self, *args, **kwargs):
+        self.store_file()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Dataset {self.id} - {self.file.name}"
 
+
+class DatasetEvent(models.Model):
+    """A dataset change, announced to the owner's (and admins') event streams; see api.events."""
+    KIND_CREATED = 'created'
+    KIND_PROCESSED = 'processed'
+    KIND_UPDATED = 'updated'
+    KIND_DELETED = 'deleted'
+    KIND_CHOICES = [
+        (KIND_CREATED, 'Created'),
+        (KIND_PROCESSED, 'Processed'),
+        (KIND_UPDATED, 'Updated'),
+        (KIND_DELETED, 'Deleted'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True)
+    # Not a foreign key: deletions are announced after the row is gone
+    dataset_id = models.BigIntegerField()
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Dataset {self.dataset_id} {self.kind}"
+
+
+class AuthToken(models.Model):
+    """
+    An API token issued at login; see api.auth.TokenAuthentication. Only the
+    sha256 of the token is stored. Revoking a token deletes its row.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    # Which client asked for it, e.g. "desktop"
+    name = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Token for {self.user.username} ({self.name or 'unnamed'})"
+
+
+class ColumnSchema(models.Model):
+    """A user's default upload schema; see api.schema.Schema for the format."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='column_schema')
+    definition = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Schema for {self.user.username}"
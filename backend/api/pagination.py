@@ -0,0 +1,75 @@
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over `(-uploaded_at, -id)`. The cursor is
+    the position of the last row served, so each page is an index range
+    scan no matter how deep into the history it is.
+
+    Only applies when the request asks for it with `?limit=` or `?cursor=`;
+    otherwise `paginate_queryset` returns None and the view keeps its
+    unpaginated response.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.limit_query_param not in params:
+            return None
+        self.request = request
+        self.limit = self.get_limit(request)
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            uploaded_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(id__lt=pk), uploaded_at__lte=uploaded_at
+            )
+        # One extra row tells whether there is a next page
+        page = list(queryset.order_by('-uploaded_at', '-id')[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.limit_query_param, self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Must be at least 1.'})
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, obj):
+        raw = json.dumps([obj.uploaded_at.isoformat(), obj.pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            iso, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            uploaded_at = parse_datetime(iso)
+            if uploaded_at is None:
+                raise ValueError(iso)
+            return uploaded_at, int(pk)
+        except (TypeError, ValueError):
+            raise ValidationError({'cursor': 'Invalid cursor.'})
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
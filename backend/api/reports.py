@@ -0,0 +1,167 @@
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.utils.http import quote_etag
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+
+def report_root():
+    return os.fspath(getattr(settings, 'REPORT_CACHE_ROOT', os.path.join(settings.BASE_DIR, 'reports')))
+
+
+def report_name(dataset):
+    # The summary is part of the name so a changed summary never serves a stale report
+    digest = hashlib.md5(json.dumps(dataset.summary, sort_keys=True).encode()).hexdigest()[:12]
+    return f'{dataset.pk}-{digest}'
+
+
+def report_path(dataset):
+    return os.path.join(report_root(), f'{report_name(dataset)}.pdf')
+
+
+def report_etag(dataset):
+    """Validator for the report's content, known without building or opening it."""
+    return quote_etag(report_name(dataset))
+
+
+BAR_COLORS = ['#667eea', '#764ba2', '#f093fb']
+PIE_COLORS = ['#667eea', '#10b981', '#fb923c', '#ec4899', '#0ea5e9']
+
+
+def render_charts(summary, dpi=150):
+    """
+    Averages bar chart and type-distribution pie, styled like the desktop
+    client's MainWindow.show_summary, rendered headless to PNG bytes.
+    Returns None when there is nothing to plot.
+    """
+    averages = summary.get('averages') or {}
+    type_dist = summary.get('type_distribution') or {}
+    if not averages and not type_dist:
+        return None
+    # Agg canvas directly: no pyplot state, no GUI backend
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(8, 3.6))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(1, 2)
+    if averages:
+        labels = list(averages.keys())
+        values = [averages[k] if averages[k] else 0 for k in labels]
+        colors = [BAR_COLORS[i % len(BAR_COLORS)] for i in range(len(labels))]
+        axes[0].bar(labels, values, color=colors, edgecolor='white', linewidth=2)
+        axes[0].set_title("Average Values", fontsize=12, fontweight='bold', color='#667eea')
+        axes[0].set_ylabel("Value", fontweight='bold')
+        axes[0].grid(axis='y', alpha=0.3)
+    else:
+        axes[0].axis('off')
+    if type_dist:
+        labels = list(type_dist.keys())
+        colors = [PIE_COLORS[i % len(PIE_COLORS)] for i in range(len(labels))]
+        axes[1].pie(list(type_dist.values()), labels=labels, autopct='%1.1f%%',
+                    colors=colors, startangle=90, textprops={'fontweight': 'bold'})
+        axes[1].set_title("Type Distribution", fontsize=12, fontweight='bold', color='#f5576c')
+    else:
+        axes[1].axis('off')
+    fig.tight_layout()
+    out = io.BytesIO()
+    fig.savefig(out, format='png', dpi=dpi)
+    out.seek(0)
+    return out
+
+
+def render_pdf(dataset, out):
+    p = canvas.Canvas(out, pagesize=letter)
+    p.setFont('Helvetica', 12)
+    p.drawString(50, 750, f"Dataset Report - ID: {dataset.id}")
+    p.drawString(50, 735, f"Uploaded at: {dataset.uploaded_at}")
+
+    y = 700
+    charts = render_charts(dataset.summary)
+    if charts is not None:
+        width, height = 512, 230
+        p.drawImage(ImageReader(charts), 50, y - height, width=width, height=height)
+        y -= height + 20
+
+    p.drawString(50, y, 'Summary:')
+    y -= 20
+    lines = [(60, f"{k}: {v}") for k,v in dataset.summary.items() if k != 'stats']
+    stats = dataset.summary.get('stats')
+    if stats:
+        lines.append((50, 'Statistics:'))
+        for col, st in stats['columns'].items():
+            values = ', '.join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k,v in st.items())
+            lines.append((60, f"{col}: {values}"))
+    for x, text in lines:
+        p.drawString(x, y, text)
+        y -= 18
+        if y < 50:
+            p.showPage()
+            y = 750
+    p.save()
+
+
+def open_report(dataset):
+    """
+    Open the cached PDF for `dataset`; raises FileNotFoundError on a miss.
+    Hits refresh the file's mtime, which is what LRU eviction orders by.
+    """
+    path = report_path(dataset)
+    f = open(path, 'rb')
+    os.utime(path)
+    return f
+
+
+def build_report(dataset):
+    path = report_path(dataset)
+    os.makedirs(report_root(), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', suffix='.pdf', dir=report_root())
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            render_pdf(dataset, out)
+        os.replace(tmp, path)
+    except Exception:
+        os.unlink(tmp)
+        raise
+    evict(keep=path)
+    return path
+
+
+def evict(max_bytes=None, keep=None):
+    """Delete least recently used reports (other than `keep`) until the cache fits in `max_bytes`."""
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+    entries = []
+    with os.scandir(report_root()) as it:
+        for entry in it:
+            if entry.name.endswith('.pdf') and not entry.name.startswith('.tmp-'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def delete(pk):
+    for path in glob.glob(os.path.join(report_root(), f'{pk}-*.pdf')):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
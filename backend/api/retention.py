@@ -0,0 +1,168 @@
+import logging
+import operator
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import reduce
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from . import columnar, dedup, events, reports
+from .models import Blob, Dataset
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {'MAX_COUNT': 5, 'MAX_AGE_DAYS': None, 'MAX_BYTES': None}
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def policy():
+    return {**DEFAULT_POLICY, **getattr(settings, 'DATASET_RETENTION', {})}
+
+
+def expired(users=None, now=None):
+    """
+    Datasets outside the retention policy, ranked per owner with window
+    functions so the whole history is evaluated in one query: beyond the
+    newest MAX_COUNT, older than MAX_AGE_DAYS, or past the MAX_BYTES budget
+    counted from the newest. A user's newest dataset is always kept.
+    """
+    limits = policy()
+    newest_first = [F('uploaded_at').desc(), F('pk').desc()]
+    qs = Dataset.objects.all()
+    if users is not None:
+        qs = qs.filter(uploaded_by__in=users)
+    qs = qs.annotate(
+        rank=Window(RowNumber(), partition_by=[F('uploaded_by')], order_by=newest_first),
+        running_bytes=Window(Sum('size'), partition_by=[F('uploaded_by')], order_by=newest_first),
+    )
+    rules = []
+    if limits['MAX_COUNT'] is not None:
+        rules.append(Q(rank__gt=limits['MAX_COUNT']))
+    if limits['MAX_BYTES'] is not None:
+        rules.append(Q(running_bytes__gt=limits['MAX_BYTES']))
+    if limits['MAX_AGE_DAYS'] is not None:
+        cutoff = (now or timezone.now()) - timedelta(days=limits['MAX_AGE_DAYS'])
+        rules.append(Q(uploaded_at__lt=cutoff))
+    if not rules:
+        return qs.none()
+    # Combined in a CASE so the mixed window/column predicate is a single filter
+    qs = qs.annotate(expired=Case(
+        When(rank=1, then=Value(False)),
+        When(reduce(operator.or_, rules), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    ))
+    return qs.filter(expired=True)
+
+
+def prune(users=None, now=None, sweep=True):
+    """
+    Delete every expired dataset with one bulk delete, release their blob
+    references and hand their files to the background sweeper. Returns
+    `(pk, owner_id)` of each pruned row.
+    """
+    victims = list(expired(users, now).values_list('pk', 'uploaded_by_id', 'file', 'blob_id'))
+    if not victims:
+        return []
+    with transaction.atomic():
+        Dataset.objects.filter(pk__in=[v[0] for v in victims]).delete()
+        dedup.release(v[3] for v in victims)
+        events.publish(events.DELETED, [(pk, owner_id) for pk, owner_id, _, _ in victims])
+    entries = [(pk, name, blob_id) for pk, _, name, blob_id in victims]
+    if sweep:
+        # Only once the rows are gone for good
+        transaction.on_commit(lambda: get_sweeper().submit(remove_files, entries))
+    else:
+        remove_files(entries)
+    return [(pk, owner_id) for pk, owner_id, _, _ in victims]
+
+
+def get_sweeper():
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retention-sweeper')
+        return _sweeper
+
+
+def remove_files(entries):
+    """
+    Delete the columnar cache and reports of pruned datasets, and their
+    stored file unless it is a blob other datasets still refer to.
+    """
+    storage = Dataset._meta.get_field('file').storage
+    for pk, name, blob_id in entries:
+        try:
+            if blob_id is not None:
+                name = dedup.collect(blob_id)
+            if name:
+                storage.delete(name)
+            columnar.delete(pk)
+            reports.delete(pk)
+        except Exception:
+            logger.exception('Could not remove files of pruned dataset %s', pk)
+
+
+def _older_than(path, cutoff):
+    try:
+        return os.path.getmtime(path) < cutoff
+    except FileNotFoundError:
+        return False
+
+
+def sweep_orphans(min_age=3600, dry_run=False):
+    """
+    Remove stored files, columnar caches and reports that no dataset or
+    blob refers to any more, e.g. left behind by a crash mid-sweep. Anything modified in
+    the last `min_age` seconds is skipped so in-flight uploads are safe.
+    Returns the removed paths.
+    """
+    cutoff = time.time() - min_age
+    # Blobs whose datasets all went without releasing them (e.g. deleted in the admin)
+    stale = Blob.objects.filter(datasets__isnull=True, created_at__lt=timezone.now() - timedelta(seconds=min_age))
+    if not dry_run:
+        stale.delete()
+    rows = list(Dataset.objects.values_list('pk', 'file'))
+    pks = {str(pk) for pk, _ in rows}
+    names = {name for _, name in rows}
+    names |= set(Blob.objects.exclude(pk__in=stale).values_list('name', flat=True))
+    orphans = []
+
+    storage = Dataset._meta.get_field('file').storage
+    upload_dir = Dataset._meta.get_field('file').upload_to
+    if storage.exists(upload_dir):
+        for filename in storage.listdir(upload_dir)[1]:
+            name = os.path.join(upload_dir, filename)
+            if name not in names and _older_than(storage.path(name), cutoff):
+                orphans.append(storage.path(name))
+
+    if os.path.isdir(columnar.cache_root()):
+        for entry in os.scandir(columnar.cache_root()):
+            if entry.name not in pks and _older_than(entry.path, cutoff):
+                orphans.append(entry.path)
+
+    if os.path.isdir(reports.report_root()):
+        for entry in os.scandir(reports.report_root()):
+            match = re.match(r'(\d+)-', entry.name)
+            if (match is None or match.group(1) not in pks) and _older_than(entry.path, cutoff):
+                orphans.append(entry.path)
+
+    if not dry_run:
+        for path in orphans:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+    return orphans
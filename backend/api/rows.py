@@ -0,0 +1,148 @@
+import numpy as np
+from rest_framework.exceptions import ValidationError
+from .sampling import lttb_indices, minmax_indices
+
+OPERATORS = {
+    'eq': np.equal,
+    'gt': np.greater,
+    'gte': np.greater_equal,
+    'lt': np.less,
+    'lte': np.less_equal,
+}
+RESERVED = {'columns', 'type', 'offset', 'limit', 'downsample', 'points', 'x', 'format'}
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10_000
+DEFAULT_POINTS = 1000
+MAX_POINTS = 10_000
+
+
+def _int_param(params, name, default, lo, hi):
+    try:
+        value = int(params.get(name, default))
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+    if value < lo:
+        raise ValidationError({name: f'Must be at least {lo}.'})
+    return min(value, hi)
+
+
+def json_values(values):
+    """Plain list with NaN (and missing Types) as null."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+    return values.tolist()
+
+
+def project(table, raw):
+    """Requested columns (`?columns=a,b`), defaulting to every cached column."""
+    available = list(table.columns) + ([table.category] if table.category else [])
+    if not raw:
+        return available
+    columns = [c for c in raw.split(',') if c]
+    unknown = [c for c in columns if c not in available]
+    if unknown:
+        raise ValidationError({'columns': f"Unknown column(s): {', '.join(unknown)}"})
+    return columns
+
+
+def select(table, params):
+    """
+    Row numbers matching the filters: `type=A,B` on the category column and
+    `<column>__<op>=<number>` on numeric ones, op being eq/gt/gte/lt/lte.
+    NaN never matches a comparison.
+    """
+    mask = None
+    for key, value in params.items():
+        if key in RESERVED:
+            continue
+        column, _, op = key.rpartition('__')
+        if column not in table.columns or op not in OPERATORS:
+            raise ValidationError({key: 'Unknown filter; expected <numeric column>__<eq|gt|gte|lt|lte>.'})
+        try:
+            bound = float(value)
+        except ValueError:
+            raise ValidationError({key: 'Must be a number.'})
+        hit = OPERATORS[op](table.columns[column], bound)
+        mask = hit if mask is None else mask & hit
+    if params.get('type'):
+        if table.codes is None:
+            raise ValidationError({'type': 'Dataset has no category column.'})
+        wanted = [table.categories.index(t) for t in params['type'].split(',') if t in table.categories]
+        hit = np.isin(table.codes, wanted)
+        mask = hit if mask is None else mask & hit
+    if mask is None:
+        return None
+    return np.flatnonzero(mask)
+
+
+def values_at(table, column, index):
+    """Values of `column` at row numbers `index` (all rows when None)."""
+    if column == table.category:
+        labels = np.array(table.categories + [None], dtype=object)
+        codes = table.codes if index is None else table.codes[index]
+        return labels[codes]
+    values = table.columns[column]
+    return np.asarray(values if index is None else values[index])
+
+
+def page(table, params):
+    columns = project(table, params.get('columns'))
+    index = select(table, params)
+    matched = table.rows if index is None else len(index)
+    offset = _int_param(params, 'offset', 0, 0, matched)
+    limit = _int_param(params, 'limit', DEFAULT_LIMIT, 1, MAX_LIMIT)
+    rows = np.arange(offset, min(offset + limit, matched)) if index is None else index[offset:offset + limit]
+    return {
+        'rows': matched,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < matched else None,
+        'index': rows.tolist(),
+        'data': {c: json_values(values_at(table, c, rows)) for c in columns},
+    }
+
+
+def downsample(table, params):
+    """
+    At most `points` points per numeric column for charting: `lttb` keeps the
+    visual shape, `minmax` keeps every bucket's extremes. `x` names the
+    numeric column to plot against; the default is the row number.
+    """
+    method = params['downsample']
+    if method not in ('lttb', 'minmax'):
+        raise ValidationError({'downsample': 'Expected "lttb" or "minmax".'})
+    points = _int_param(params, 'points', DEFAULT_POINTS, 3, MAX_POINTS)
+    x_name = params.get('x')
+    if x_name and x_name not in table.columns:
+        raise ValidationError({'x': f"Unknown numeric column '{x_name}'."})
+    columns = [c for c in project(table, params.get('columns')) if c in table.columns and c != x_name]
+    index = select(table, params)
+    rows = np.arange(table.rows) if index is None else index
+    x = values_at(table, x_name, rows) if x_name else rows.astype(float)
+
+    series = {}
+    for column in columns:
+        y = values_at(table, column, rows)
+        keep = ~(np.isnan(y) | np.isnan(x))
+        cx, cy = x[keep], y[keep]
+        if x_name:
+            # LTTB and bucketing assume x increases along the series
+            order = np.argsort(cx, kind='stable')
+            cx, cy = cx[order], cy[order]
+        if method == 'lttb':
+            picked = lttb_indices(cx, cy, points)
+        else:
+            picked = minmax_indices(cy, max(points // 2, 1))
+        xs = cx[picked] if x_name else cx[picked].astype(np.int64)
+        series[column] = {'x': json_values(xs), 'y': json_values(cy[picked])}
+    return {
+        'rows': len(rows),
+        'downsample': method,
+        'points': points,
+        'x': x_name or 'index',
+        'series': series,
+    }
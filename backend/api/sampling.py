@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Indices of the minimum and maximum of `y` in each of `n_buckets` equal
+    slices, in row order. Keeps every peak and trough, so spikes survive
+    downsampling; returns at most 2 * n_buckets points.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    starts = np.arange(n_buckets) * n // n_buckets
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(starts, n)))
+    lows = np.where(np.isnan(y), np.inf, y)
+    highs = np.where(np.isnan(y), -np.inf, y)
+    picked = []
+    for values, reduce in ((lows, np.minimum), (highs, np.maximum)):
+        extreme = reduce.reduceat(values, starts)
+        hits = np.flatnonzero(values == extreme[bucket])
+        # First hit in every bucket
+        _, first = np.unique(bucket[hits], return_index=True)
+        picked.append(hits[first])
+    return np.unique(np.concatenate(picked))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    each bucket in between, the point forming the largest triangle with the
+    previously kept point and the next bucket's centroid. NaN rows must be
+    dropped by the caller. `n_out` must be at least 3.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Interior points split into n_out - 2 buckets
+    edges = 1 + (np.arange(n_out - 1) * (n - 2)) // (n_out - 2)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    centroid_x = np.append(sums_x / sizes, x[-1])
+    centroid_y = np.append(sums_y / sizes, y[-1])
+
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = centroid_x[b + 1], centroid_y[b + 1]
+        area = np.abs((x[prev] - cx) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (cy - y[prev]))
+        prev = lo + int(np.argmax(area))
+        picked[b + 1] = prev
+    return picked
@@ -0,0 +1,80 @@
+DTYPES = {
+    'float': 'float64',
+    'int': 'Int64',
+    'category': 'category',
+    'string': 'string',
+}
+NUMERIC_DTYPES = ('float', 'int')
+
+DEFAULT_SCHEMA = {
+    'columns': [
+        {'name': 'Type', 'dtype': 'category'},
+        {'name': 'Flowrate', 'dtype': 'float'},
+        {'name': 'Pressure', 'dtype': 'float'},
+        {'name': 'Temperature', 'dtype': 'float'},
+    ],
+    'category': 'Type',
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class Schema:
+    """
+    Columns to read from an upload, with their dtypes and optional units.
+    Only these columns are parsed; everything else in the file is skipped.
+    """
+
+    def __init__(self, columns, category=None):
+        self.columns = columns
+        self.category = category
+
+    @classmethod
+    def from_dict(cls, data):
+        if data is None:
+            data = DEFAULT_SCHEMA
+        if not isinstance(data, dict) or not isinstance(data.get('columns'), list) or not data['columns']:
+            raise SchemaError('Schema must be an object with a non-empty "columns" list')
+        columns, seen = [], set()
+        for col in data['columns']:
+            if not isinstance(col, dict) or not isinstance(col.get('name'), str) or not col['name']:
+                raise SchemaError('Each schema column needs a "name"')
+            dtype = col.get('dtype', 'float')
+            if dtype not in DTYPES:
+                raise SchemaError(f"Column '{col['name']}' has unsupported dtype '{dtype}' (expected one of {', '.join(DTYPES)})")
+            if col['name'] in seen:
+                raise SchemaError(f"Column '{col['name']}' is listed twice")
+            seen.add(col['name'])
+            entry = {'name': col['name'], 'dtype': dtype}
+            if col.get('unit'):
+                entry['unit'] = str(col['unit'])
+            columns.append(entry)
+        category = data.get('category')
+        if category is not None and category not in seen:
+            raise SchemaError(f"Category column '{category}' is not one of the schema columns")
+        return cls(columns, category)
+
+    def to_dict(self):
+        return {'columns': self.columns, 'category': self.category}
+
+    @property
+    def names(self):
+        return [c['name'] for c in self.columns]
+
+    @property
+    def numeric_cols(self):
+        return [c['name'] for c in self.columns if c['dtype'] in NUMERIC_DTYPES]
+
+    @property
+    def units(self):
+        return {c['name']: c['unit'] for c in self.columns if 'unit' in c}
+
+    def read_csv_kwargs(self):
+        names = set(self.names)
+        return {
+            # A callable tolerates schema columns missing from the file
+            'usecols': lambda c: c in names,
+            'dtype': {c['name']: DTYPES[c['dtype']] for c in self.columns},
+        }
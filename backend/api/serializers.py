@@ -21,6 +21,19 @@ class DatasetSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Dataset
-        fields = ('id', 'file', 'uploaded_at', 'summary', 'uploaded_by_username')
-        read_only_fields = ('uploaded_at', 'summary', 'uploaded_by_username')
+        fields = ('id', 'file', 'uploaded_at', 'summary', 'uploaded_by_username', 'status', 'error', 'schema')
+        read_only_fields = ('uploaded_at', 'summary', 'uploaded_by_username', 'status', 'error', 'schema')
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Optional subset of Meta.fields, e.g. to leave out the heavy summary
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class DatasetStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Dataset
+        fields = ('id', 'status', 'error')
+        read_only_fields = fields
 
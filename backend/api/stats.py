@@ -0,0 +1,161 @@
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+CHUNK_ROWS = 1 << 20
+
+
+def _clean(value):
+    value = float(value)
+    return None if not np.isfinite(value) else value
+
+
+def percentiles(valid):
+    """
+    PERCENTILES of `valid` (a 1-D array without NaNs, reordered in place),
+    interpolated linearly. Afterwards valid[0] and valid[-1] are its min and
+    max.
+    """
+    last = valid.size - 1
+    positions = {p: last * (p / 100) for p in PERCENTILES}
+    kth = sorted({0, last} | {int(np.floor(pos)) for pos in positions.values()}
+                 | {int(np.ceil(pos)) for pos in positions.values()})
+    valid.partition(kth)
+    result = {}
+    for p, pos in positions.items():
+        lo, hi = valid[int(np.floor(pos))], valid[int(np.ceil(pos))]
+        result[f'p{p}'] = _clean(lo + (hi - lo) * (pos - np.floor(pos)))
+    return result
+
+
+def column_stats(values):
+    """
+    Count/mean/std/min/max/percentiles of one column (a 1-D, possibly
+    memory-mapped array). Only the column's valid values are copied, once:
+    np.partition places min, max and every percentile's neighbours, and the
+    variance is then taken over the same buffer.
+    """
+    valid = values[~np.isnan(values)]
+    count = valid.size
+    result = {'count': count, 'mean': None, 'std': None, 'min': None, 'max': None}
+    result.update({f'p{p}': None for p in PERCENTILES})
+    if not count:
+        return result
+
+    result.update(percentiles(valid))
+    result['min'] = _clean(valid[0])
+    result['max'] = _clean(valid[-1])
+    mean = valid.sum() / count
+    valid -= mean
+    result['mean'] = _clean(mean)
+    result['std'] = _clean(np.sqrt(np.dot(valid, valid) / (count - 1))) if count > 1 else None
+    return result
+
+
+def grouped_stats(values, codes, n_groups):
+    """
+    Per-group count/sum/sum of squares/min/max of one column, accumulated over
+    blocks of CHUNK_ROWS so memory stays flat however long the column is.
+    """
+    count = np.zeros(n_groups, dtype=np.int64)
+    total, squares = np.zeros(n_groups), np.zeros(n_groups)
+    lo, hi = np.full(n_groups, np.inf), np.full(n_groups, -np.inf)
+    for start in range(0, len(values), CHUNK_ROWS):
+        block = np.asarray(values[start:start + CHUNK_ROWS])
+        block_codes = np.asarray(codes[start:start + CHUNK_ROWS])
+        # Rows without a Type (code -1) are left out of every group
+        keep = (block_codes >= 0) & ~np.isnan(block)
+        block, block_codes = block[keep], block_codes[keep]
+        count += np.bincount(block_codes, minlength=n_groups)
+        total += np.bincount(block_codes, weights=block, minlength=n_groups)
+        squares += np.bincount(block_codes, weights=block * block, minlength=n_groups)
+        np.minimum.at(lo, block_codes, block)
+        np.maximum.at(hi, block_codes, block)
+    return {'count': count, 'total': total, 'squares': squares, 'min': lo, 'max': hi}
+
+
+def group_summary(count, total, squares, lo, hi):
+    """count/mean/std/min/max of one group from its running sums."""
+    if not count:
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+    mean = total / count
+    std = np.sqrt(max((squares - count * mean * mean) / (count - 1), 0.0)) if count > 1 else None
+    return {'count': int(count), 'mean': _clean(mean), 'std': _clean(std) if std is not None else None,
+            'min': _clean(lo), 'max': _clean(hi)}
+
+
+def compute_stats(table):
+    """
+    Extended statistics for a ColumnarTable: per-column descriptive stats and
+    per-Type aggregates, computed one column at a time from the memory-mapped
+    columns rather than from a copy of the whole table.
+    """
+    columns = {name: column_stats(values) for name, values in table.columns.items()}
+
+    by_type = {}
+    if table.codes is not None and table.columns:
+        n_groups = len(table.categories)
+        rows = np.zeros(n_groups, dtype=np.int64)
+        for start in range(0, table.rows, CHUNK_ROWS):
+            block_codes = np.asarray(table.codes[start:start + CHUNK_ROWS])
+            rows += np.bincount(block_codes[block_codes >= 0], minlength=n_groups)
+        by_type = {label: {'count': int(rows[g])} for g, label in enumerate(table.categories)}
+        for name, values in table.columns.items():
+            groups = grouped_stats(values, table.codes, n_groups)
+            for g, label in enumerate(table.categories):
+                by_type[label][name] = group_summary(*(groups[k][g] for k in ('count', 'total', 'squares', 'min', 'max')))
+    return {'columns': columns, 'by_type': by_type}
+
+
+EMPTY = {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+
+
+def merge_moments(a, b):
+    """
+    count/mean/std/min/max of two disjoint sets of rows, from each set's own
+    (the pairwise variance update; exact, unlike percentiles).
+    """
+    if not b['count']:
+        return {k: a[k] for k in EMPTY}
+    if not a['count']:
+        return {k: b[k] for k in EMPTY}
+    n = a['count'] + b['count']
+    result = {'count': n, 'mean': None, 'std': None}
+    if a['mean'] is not None and b['mean'] is not None:
+        delta = b['mean'] - a['mean']
+        result['mean'] = a['mean'] + delta * b['count'] / n
+        m2 = sum((s['std'] or 0.0) ** 2 * (s['count'] - 1) for s in (a, b)) + delta * delta * a['count'] * b['count'] / n
+        result['std'] = _clean(np.sqrt(m2 / (n - 1)))
+    result['min'] = min((v for v in (a['min'], b['min']) if v is not None), default=None)
+    result['max'] = max((v for v in (a['max'], b['max']) if v is not None), default=None)
+    return result
+
+
+def merge_stats(old, added):
+    """
+    compute_stats of a dataset extended by new rows, from the stats of the
+    old and the new rows. Percentiles don't combine: they come back as None
+    with `percentiles_stale` set, for `refresh_percentiles` to fill in.
+    """
+    columns = {}
+    for name in {**old['columns'], **added['columns']}:
+        columns[name] = merge_moments(old['columns'].get(name, EMPTY), added['columns'].get(name, EMPTY))
+        columns[name].update({f'p{p}': None for p in PERCENTILES})
+
+    by_type = {}
+    for label in {**old['by_type'], **added['by_type']}:
+        a, b = old['by_type'].get(label, {'count': 0}), added['by_type'].get(label, {'count': 0})
+        by_type[label] = {'count': a['count'] + b['count']}
+        for name in columns:
+            by_type[label][name] = merge_moments(a.get(name, EMPTY), b.get(name, EMPTY))
+    return {'columns': columns, 'by_type': by_type, 'percentiles_stale': True}
+
+
+def refresh_percentiles(stats, table):
+    """Fill in the percentiles of `stats` left stale by merge_stats, from the whole of `table`."""
+    for name, col in stats['columns'].items():
+        values = table.columns.get(name)
+        valid = values[~np.isnan(values)] if values is not None else None
+        if valid is not None and valid.size:
+            col.update(percentiles(valid))
+    stats.pop('percentiles_stale', None)
+    return stats
@@ -0,0 +1,113 @@
+import gzip
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+GZIP_MAGIC = b'\x1f\x8b'
+BLOCK_SIZE = 1024 * 1024
+
+
+def compress_level():
+    return getattr(settings, 'DATASET_COMPRESS_LEVEL', 1)
+
+
+def is_gzip(f):
+    """Whether the file-like `f` holds gzip data; leaves it rewound."""
+    f.seek(0)
+    head = f.read(2)
+    f.seek(0)
+    return head == GZIP_MAGIC
+
+
+def strip_gz(name):
+    return name[:-3] if name.lower().endswith('.gz') else name
+
+
+def open_csv(path):
+    """Open a CSV on disk for reading, inflating it on the fly if it is gzipped."""
+    f = open(path, 'rb')
+    if is_gzip(f):
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    return f
+
+
+class GzipReader(File):
+    """Read side of a stored file: the inflated stream, closing the raw file with it."""
+
+    def __init__(self, raw, name):
+        self.raw = raw
+        super().__init__(gzip.GzipFile(fileobj=raw, mode='rb'), name)
+
+    def close(self):
+        super().close()
+        self.raw.close()
+
+
+class Uncompressed(File):
+    """
+    Wrap an upload so the storage keeps it as is (moved, not rewritten);
+    for files a worker compresses later with `compress_stored`.
+    """
+
+    def __init__(self, upload):
+        super().__init__(upload, upload.name)
+        if hasattr(upload, 'temporary_file_path'):
+            self.temporary_file_path = upload.temporary_file_path
+
+
+class CompressedFileSystemStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps files gzip-compressed on disk under their
+    original names. Already-gzipped content (e.g. .csv.gz uploads, or
+    ingest's compressed spool) is stored as is, moved rather than copied
+    when it is a temporary file. Opening for reading inflates on the fly;
+    files written before compression was enabled are read unchanged.
+    `size()` is the compressed size on disk.
+    """
+
+    def _save(self, name, content):
+        if isinstance(content, Uncompressed) or is_gzip(content):
+            return super()._save(name, content)
+        spool = self._compress(content)
+        try:
+            return super()._save(name, spool)
+        finally:
+            spool.close()
+
+    def _compress(self, content):
+        spool = TemporaryUploadedFile(content.name, 'application/gzip', 0, None)
+        with gzip.GzipFile(fileobj=spool.file, mode='wb', compresslevel=compress_level(), mtime=0) as gz:
+            shutil.copyfileobj(content, gz, BLOCK_SIZE)
+        spool.file.flush()
+        spool.seek(0)
+        return spool
+
+    def _open(self, name, mode='rb'):
+        raw = super()._open(name, mode)
+        if 'r' in mode and 'b' in mode and is_gzip(raw):
+            return GzipReader(raw, name)
+        return raw
+
+    def open_raw(self, name):
+        """The bytes as stored, without inflating."""
+        return super()._open(name, 'rb')
+
+    def compress_stored(self, name):
+        """Gzip a file stored uncompressed, replacing it atomically; returns its new size."""
+        path = self.path(name)
+        with open(path, 'rb') as src:
+            if not is_gzip(src):
+                fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(path))
+                try:
+                    with os.fdopen(fd, 'wb') as out:
+                        with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=compress_level(), mtime=0) as gz:
+                            shutil.copyfileobj(src, gz, BLOCK_SIZE)
+                    os.replace(tmp, path)
+                except Exception:
+                    os.unlink(tmp)
+                    raise
+        return os.path.getsize(path)
@@ -0,0 +1,532 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from benchmarks import synthetic
+from benchmarks.queries import seed
+
+from . import auth, bulk, cache, columnar, events, ingest, jobs, retention
+from .models import AuthToken, Blob, Dataset, DatasetEvent
+from .schema import Schema
+
+CSV = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,120,5.2,110\nV-1,Valve,60,4.1,105\n'
+
+
+class APITestCase(TestCase):
+    """Scratch media and report directories, a per-process cache and uploads summarized in the request."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.overrides = override_settings(
+            MEDIA_ROOT=cls.tmp, REPORT_CACHE_ROOT=f'{cls.tmp}/reports', UPLOAD_WORKERS=0, PRERENDER_REPORTS=False,
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        )
+        cls.overrides.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.overrides.disable()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pw')
+        self.client.force_login(self.user)
+
+    def upload(self, content, schema=None, name='data.csv'):
+        data = {'file': SimpleUploadedFile(name, content, 'text/csv')}
+        if schema is not None:
+            data['schema'] = schema if isinstance(schema, str) else json.dumps(schema)
+        return self.client.post('/api/upload/', data)
+
+
+class SchemaMismatchTests(APITestCase):
+    def test_invalid_schema_json(self):
+        response = self.upload(CSV, schema='{"columns": [')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Schema is not valid JSON', response.json()['detail'])
+
+    def test_invalid_schema_definition(self):
+        for schema in (
+            {'columns': []},
+            {'columns': [{'name': 'Flowrate', 'dtype': 'complex'}]},
+            {'columns': [{'name': 'Flowrate'}, {'name': 'Flowrate'}]},
+            {'columns': [{'name': 'Flowrate'}], 'category': 'Type'},
+        ):
+            with self.subTest(schema=schema):
+                response = self.upload(CSV, schema=schema)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Invalid schema', response.json()['detail'])
+        response = self.client.put('/api/schema/', {'columns': [{'name': 'Flowrate', 'dtype': 'complex'}]},
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_value_not_matching_dtype_inline(self):
+        response = self.upload(CSV.replace(b'120', b'fast'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Error reading CSV', response.json()['detail'])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_value_not_matching_dtype_in_worker(self):
+        schema = {'columns': [{'name': 'Type', 'dtype': 'category'}, {'name': 'Flowrate', 'dtype': 'int'}],
+                  'category': 'Type'}
+        dataset = Dataset.objects.create(
+            file=ContentFile(CSV.replace(b'120', b'120.5'), name='data.csv'), status=Dataset.STATUS_PENDING,
+            schema=Schema.from_dict(schema).to_dict(), uploaded_by=self.user,
+        )
+        self.assertEqual(jobs.process_dataset(dataset.pk), Dataset.STATUS_FAILED)
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.status, Dataset.STATUS_FAILED)
+        self.assertIn('Error reading CSV', dataset.error)
+        self.assertIsNone(dataset.summary)
+
+    def test_missing_schema_column_has_null_average(self):
+        schema = {'columns': [{'name': 'Type', 'dtype': 'category'}, {'name': 'Flowrate'}, {'name': 'Viscosity'}],
+                  'category': 'Type'}
+        response = self.upload(CSV, schema=schema)
+        self.assertEqual(response.status_code, 201)
+        averages = response.json()['summary']['averages']
+        self.assertEqual(averages['Flowrate'], 90.0)
+        self.assertIsNone(averages['Viscosity'])
+
+    def test_columns_outside_schema_are_not_parsed(self):
+        # Values that would not parse as numbers, in columns the schema leaves out
+        content = CSV.replace(b'Temperature\n', b'Temperature,Notes\n').replace(b'110\n', b'110,hot\n')
+        content = content.replace(b'120', b'fast')
+        schema = {'columns': [{'name': 'Type', 'dtype': 'category'}, {'name': 'Pressure'}], 'category': 'Type'}
+        response = self.upload(content, schema=schema)
+        self.assertEqual(response.status_code, 201)
+        summary = response.json()['summary']
+        self.assertEqual(set(summary['averages']), {'Pressure'})
+        self.assertEqual(set(summary['stats']['columns']), {'Pressure'})
+        self.assertEqual(summary['type_distribution'], {'Pump': 1, 'Valve': 1})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class JobStatusTests(APITestCase):
+    """Uploads processed on the worker pool: pending -> processing -> ready or failed, and recovery after a restart."""
+
+    def pending(self, content=CSV, status=Dataset.STATUS_PENDING):
+        return Dataset.objects.create(file=ContentFile(content, name='data.csv'), status=status,
+                                      schema=Schema.from_dict(None).to_dict(), uploaded_by=self.user)
+
+    def test_processing_claims_a_pending_dataset_once(self):
+        dataset = self.pending()
+        seen, summarize = [], ingest.summarize_csv
+
+        def spy(*args, **kwargs):
+            seen.append(Dataset.objects.get(pk=dataset.pk).status)
+            return summarize(*args, **kwargs)
+
+        with mock.patch.object(ingest, 'summarize_csv', spy):
+            self.assertEqual(jobs.process_dataset(dataset.pk), Dataset.STATUS_READY)
+        self.assertEqual(seen, [Dataset.STATUS_PROCESSING])
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.status, Dataset.STATUS_READY)
+        self.assertEqual(dataset.summary['total_count'], 2)
+        self.assertIsNone(jobs.process_dataset(dataset.pk))
+
+    def test_crashed_worker_marks_the_dataset_failed(self):
+        dataset = self.pending(status=Dataset.STATUS_PROCESSING)
+        future = Future()
+        future.set_exception(BrokenProcessPool('worker died'))
+        with self.assertLogs('api.jobs', 'ERROR'):
+            jobs._on_done(dataset.pk, future)
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.status, Dataset.STATUS_FAILED)
+        self.assertIn('Processing failed', dataset.error)
+
+    def test_recover_processes_interrupted_uploads(self):
+        pending, processing = self.pending(), self.pending(status=Dataset.STATUS_PROCESSING)
+        broken = self.pending(CSV.replace(b'120', b'fast'))
+        ready = self.pending(status=Dataset.STATUS_READY)
+        out = io.StringIO()
+        call_command('recover_datasets', stdout=out)
+        self.assertIn('Recovered 3 interrupted upload(s)', out.getvalue())
+        statuses = dict(Dataset.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {pending.pk: Dataset.STATUS_READY, processing.pk: Dataset.STATUS_READY,
+                                    broken.pk: Dataset.STATUS_FAILED, ready.pk: Dataset.STATUS_READY})
+
+    def test_recover_can_mark_interrupted_uploads_failed(self):
+        pending, processing = self.pending(), self.pending(status=Dataset.STATUS_PROCESSING)
+        self.assertEqual(jobs.recover(fail=True), {pending.pk: Dataset.STATUS_FAILED, processing.pk: Dataset.STATUS_FAILED})
+        self.assertEqual(set(Dataset.objects.values_list('error', flat=True)), {'Processing was interrupted'})
+        self.assertEqual(DatasetEvent.objects.filter(kind=events.PROCESSED).count(), 2)
+
+
+class QueryCountTests(APITestCase):
+    """
+    SQL queries per request, with every request taking the uncached path,
+    are fixed however long the user's history is (`python -m
+    benchmarks.queries` shows the plans).
+    """
+    expected = {'list': 3, 'detail': 3, 'status': 3, 'upload': 12}
+
+    def test_query_counts_do_not_grow_with_history(self):
+        for history in (5, 50):
+            with self.subTest(history=history):
+                user = User.objects.create_user(f'history{history}', password='pw')
+                self.client.force_login(user)
+                upload = seed(user, history)
+                pk = Dataset.objects.filter(uploaded_by=user).latest('pk').pk
+                requests = {
+                    'list': lambda: self.client.get('/api/datasets/'),
+                    'detail': lambda: self.client.get(f'/api/datasets/{pk}/'),
+                    'status': lambda: self.client.get(f'/api/datasets/{pk}/status/'),
+                    'upload': lambda: self.client.post('/api/upload/', {'file': upload}),
+                }
+                for name, request in requests.items():
+                    with self.assertNumQueries(self.expected[name], msg=name):
+                        response = request()
+                    self.assertLess(response.status_code, 400, name)
+
+
+class AppendStatsTests(APITestCase):
+    """Stats merged on append match a full recompute over the same rows."""
+
+    def assertStatsEqual(self, merged, full, keys):
+        self.assertEqual(merged.keys(), full.keys())
+        for name in full:
+            for key in keys:
+                with self.subTest(name=name, key=key):
+                    if full[name][key] is None:
+                        self.assertIsNone(merged[name][key])
+                    else:
+                        self.assertAlmostEqual(merged[name][key], full[name][key], places=9)
+
+    def test_merged_stats_match_full_recompute(self):
+        old = synthetic.generate(400, columns=4, types=8, seed=1)
+        new = synthetic.generate(150, columns=4, types=10, seed=2)
+        schema = synthetic.schema(4)
+        pk = self.upload(old, schema=schema).json()['id']
+        with mock.patch.object(columnar, 'table_for', wraps=columnar.table_for) as table_for:
+            response = self.client.post(f'/api/datasets/{pk}/append/', {'file': SimpleUploadedFile('more.csv', new)})
+        self.assertEqual(response.status_code, 200)
+        # Only the new rows are read: no pass over the whole column for the percentiles
+        table_for.assert_not_called()
+        merged = Dataset.objects.get(pk=pk).summary['stats']
+        self.assertTrue(merged['percentiles_stale'])
+        self.assertTrue(all(col['p50'] is None for col in merged['columns'].values()))
+
+        combined = old + new.split(b'\n', 1)[1]
+        full = Dataset.objects.get(pk=self.upload(combined, schema=schema, name='all.csv').json()['id']).summary['stats']
+        moments = ('count', 'mean', 'std', 'min', 'max')
+        self.assertStatsEqual(merged['columns'], full['columns'], moments)
+        self.assertEqual(merged['by_type'].keys(), full['by_type'].keys())
+        for label in full['by_type']:
+            self.assertEqual(merged['by_type'][label]['count'], full['by_type'][label]['count'])
+            self.assertStatsEqual({c: merged['by_type'][label][c] for c in full['columns']},
+                                  {c: full['by_type'][label][c] for c in full['columns']}, moments)
+
+        # The first reader that needs the percentiles fills them in
+        self.assertEqual(self.client.get(f'/api/datasets/{pk}/pdf/').status_code, 200)
+        refreshed = Dataset.objects.get(pk=pk).summary['stats']
+        self.assertNotIn('percentiles_stale', refreshed)
+        self.assertStatsEqual(refreshed['columns'], full['columns'], moments + ('p50', 'p95', 'p99'))
+
+
+class ReportTests(APITestCase):
+    def test_report_needs_the_owner(self):
+        pk = self.upload(CSV).json()['id']
+        response = self.client.get(f'/api/datasets/{pk}/pdf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'%PDF')
+        self.client.force_login(User.objects.create_user('mallory', password='pw'))
+        self.assertEqual(self.client.get(f'/api/datasets/{pk}/pdf/').status_code, 404)
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        self.assertEqual(self.client.get(f'/api/datasets/{pk}/pdf/').status_code, 200)
+
+
+@override_settings(DATASET_RETENTION={'MAX_COUNT': None, 'MAX_AGE_DAYS': None, 'MAX_BYTES': None})
+class RetentionTests(APITestCase):
+    def make(self, user, n, size=100, age_days=0):
+        """`n` datasets of `user`, oldest first, `age_days` apart with the newest `age_days` old."""
+        created = []
+        for i in range(n):
+            dataset = Dataset.objects.create(file=ContentFile(CSV + str(i).encode(), name='data.csv'), uploaded_by=user)
+            days = (n - i) * age_days
+            Dataset.objects.filter(pk=dataset.pk).update(size=size, uploaded_at=timezone.now() - timedelta(days=days, seconds=n - i))
+            created.append(dataset)
+        return created
+
+    def prune(self, **limits):
+        with override_settings(DATASET_RETENTION={'MAX_COUNT': None, 'MAX_AGE_DAYS': None, 'MAX_BYTES': None, **limits}):
+            return sorted(pk for pk, _ in retention.prune(sweep=False))
+
+    def exists(self, dataset):
+        return dataset.file.storage.exists(dataset.file.name)
+
+    def test_max_count(self):
+        mine = self.make(self.user, 4)
+        theirs = self.make(User.objects.create_user('bob'), 3)
+        self.assertEqual(self.prune(MAX_COUNT=2), sorted(d.pk for d in mine[:2] + theirs[:1]))
+        self.assertEqual(set(Dataset.objects.values_list('pk', flat=True)), {d.pk for d in mine[2:] + theirs[1:]})
+        self.assertFalse(self.exists(mine[0]))
+        self.assertTrue(self.exists(mine[2]))
+        self.assertEqual(self.prune(MAX_COUNT=2), [])
+
+    def test_max_age_keeps_the_newest(self):
+        old = self.make(self.user, 3, age_days=10)
+        self.assertEqual(self.prune(MAX_AGE_DAYS=25), [old[0].pk])
+        # Everything left is past the limit, but a user's newest dataset always stays
+        self.assertEqual(self.prune(MAX_AGE_DAYS=1), [old[1].pk])
+        self.assertEqual(list(Dataset.objects.values_list('pk', flat=True)), [old[2].pk])
+
+    def test_max_bytes_counts_from_the_newest(self):
+        datasets = self.make(self.user, 4, size=100)
+        self.assertEqual(self.prune(MAX_BYTES=250), [datasets[0].pk, datasets[1].pk])
+
+    def test_dry_run(self):
+        datasets = self.make(self.user, 3)
+        out = io.StringIO()
+        with override_settings(DATASET_RETENTION={'MAX_COUNT': 1}):
+            call_command('prune_datasets', '--dry-run', '--no-orphans', stdout=out)
+        self.assertIn('Would prune 2 dataset(s)', out.getvalue())
+        self.assertEqual(Dataset.objects.count(), 3)
+        self.assertTrue(all(self.exists(d) for d in datasets))
+
+    def test_command_prunes_only_the_given_users(self):
+        mine = self.make(self.user, 3)
+        self.make(User.objects.create_user('bob'), 3)
+        out = io.StringIO()
+        with override_settings(DATASET_RETENTION={'MAX_COUNT': 1}):
+            call_command('prune_datasets', '--user', 'alice', '--no-orphans', stdout=out)
+        self.assertIn('Pruned 2 dataset(s)', out.getvalue())
+        self.assertEqual(Dataset.objects.filter(uploaded_by=self.user).get(), mine[2])
+        self.assertEqual(Dataset.objects.count(), 4)
+
+    def test_shared_blob_outlives_a_pruned_dataset(self):
+        first = Dataset.objects.get(pk=self.upload(CSV).json()['id'])
+        second = Dataset.objects.get(pk=self.upload(CSV).json()['id'])
+        self.assertEqual((second.file.name, second.blob_id), (first.file.name, first.blob_id))
+        self.upload(CSV.replace(b'120', b'121'))
+
+        self.assertEqual(self.prune(MAX_COUNT=2), [first.pk])
+        self.assertTrue(self.exists(second))
+        self.assertEqual(Blob.objects.get(pk=second.blob_id).refs, 1)
+        self.assertEqual(self.client.get(second.file.url).status_code, 200)
+
+        self.assertEqual(self.prune(MAX_COUNT=1), [second.pk])
+        self.assertFalse(self.exists(second))
+        self.assertFalse(Blob.objects.filter(pk=second.blob_id).exists())
+
+
+class CompareTests(APITestCase):
+    def test_aligns_on_the_union_of_types(self):
+        a = self.upload(CSV).json()['id']
+        b = self.upload(CSV.replace(b'V-1,Valve', b'R-1,Reactor').replace(b'120', b'100')).json()['id']
+        data = self.client.get(f'/api/datasets/compare/?ids={a},{b}').json()
+        self.assertEqual(data['types'], ['Pump', 'Valve', 'Reactor'])
+        self.assertEqual(data['type_counts'], [[1, 1, 0], [1, 0, 1]])
+        self.assertEqual(data['type_count_deltas'], [[0, 0, 0], [0, -1, 1]])
+        self.assertEqual(data['type_means']['Flowrate'], [[120, 60, None], [100, None, 60]])
+        self.assertEqual(data['type_mean_deltas']['Flowrate'], [[0, 0, None], [-20, None, None]])
+        self.assertEqual(data['column_stats']['max'][1], [100, 5.2, 110])
+
+
+class MediaTests(APITestCase):
+    """Stored datasets are gzipped; downloads (DEBUG is off under the test runner) still give the uploaded bytes."""
+
+    def test_download_stored_dataset(self):
+        url = self.upload(CSV).json()['file']
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), CSV)
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSV)
+
+    def test_download_needs_the_owner(self):
+        url = self.upload(CSV).json()['file']
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(User.objects.create_user('mallory', password='pw'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class DedupTests(APITestCase):
+    def test_reupload_reuses_only_the_uploaders_own_datasets(self):
+        first = self.upload(CSV).json()
+        again = self.upload(CSV).json()
+        self.assertEqual(again['file'], first['file'])
+        self.assertEqual(Blob.objects.get().refs, 2)
+
+        self.client.force_login(User.objects.create_user('bob', password='pw'))
+        with mock.patch.object(columnar, 'link') as link:
+            other = self.upload(CSV).json()
+        link.assert_not_called()
+        self.assertNotEqual(other['file'], first['file'])
+        self.assertEqual(other['summary'], first['summary'])
+        self.assertEqual(Blob.objects.count(), 2)
+
+
+class BulkUploadTests(APITestCase):
+    def bulk(self, *contents):
+        files = [SimpleUploadedFile(f'{n}.csv', content, 'text/csv') for n, content in enumerate(contents)]
+        return self.client.post('/api/upload/bulk/', {'files': files})
+
+    def test_duplicates_are_not_parsed_again(self):
+        other = CSV.replace(b'120', b'125')
+        with mock.patch.object(jobs, 'ingest_paths', wraps=jobs.ingest_paths) as ingest:
+            response = self.bulk(CSV, CSV, other)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(ingest.call_args.args[0]), 2)
+            self.assertEqual([r['status'] for r in response.json()['results']], ['created'] * 3)
+
+            # An earlier upload's content costs no parse either
+            response = self.bulk(other)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(ingest.call_args.args[0], [])
+
+        self.assertEqual(Dataset.objects.count(), 4)
+        self.assertEqual(Blob.objects.count(), 2)
+        summaries = {d.content_hash: d.summary for d in Dataset.objects.all()}
+        self.assertEqual(len(summaries), 2)
+
+    def archive(self, members):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, content in members.items():
+                archive.writestr(name, content)
+        return SimpleUploadedFile('batch.zip', buf.getvalue(), 'application/zip')
+
+    def test_zip_member_limits_apply_before_inflating(self):
+        members = {f'{n}.csv': CSV.replace(b'120', str(n).encode()) for n in range(5)}
+        with tempfile.TemporaryDirectory() as workdir:
+            with self.assertRaisesMessage(bulk.BulkUploadError, 'Too many files'):
+                bulk.collect_inputs([self.archive(members)], workdir, max_files=3)
+            self.assertEqual(len(os.listdir(workdir)), 3)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            bomb = self.archive({'big.csv': CSV + b'P-2,Pump,1,2,3\n' * 100_000})
+            with self.assertRaisesMessage(bulk.BulkUploadError, 'inflate to too much data'):
+                bulk.collect_inputs([bomb], workdir, max_files=10, max_bytes=1024 * 1024)
+            self.assertEqual(os.listdir(workdir), [])
+
+        with tempfile.TemporaryDirectory() as workdir, self.assertRaises(bulk.BulkUploadError):
+            # Enforced while copying too, whatever the member's header claims
+            bulk._spool(io.BytesIO(b'x' * 5000), os.path.join(workdir, 'out'), limit=4096)
+
+        with self.settings(BULK_UPLOAD_MAX_BYTES=256):
+            response = self.client.post('/api/upload/bulk/', {'files': [self.archive(members)]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_duplicate_of_a_failed_file_reports_its_error(self):
+        response = self.bulk(CSV.replace(b'120', b'fast'), CSV.replace(b'120', b'fast'))
+        self.assertEqual(response.status_code, 400)
+        details = [r['detail'] for r in response.json()['results']]
+        self.assertEqual(details[0], details[1])
+        self.assertIn('Error reading CSV', details[0])
+
+
+class ConditionalRequestTests(APITestCase):
+    def test_change_within_the_same_second_is_not_a_304(self):
+        clock = SimpleNamespace(time=lambda: 1_700_000_000.2)
+        with mock.patch.object(cache, 'time', clock):
+            first = self.client.get('/api/datasets/')
+            clock.time = lambda: 1_700_000_000.7
+            self.upload(CSV)
+        response = self.client.get('/api/datasets/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        response = self.client.get('/api/datasets/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/datasets/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class EventTrimTests(APITestCase):
+    def test_publishing_trims_old_events_periodically(self):
+        inline = SimpleNamespace(submit=lambda fn: fn())
+        with mock.patch.object(events, '_last_trim', None), \
+                mock.patch.object(retention, 'get_sweeper', return_value=inline), \
+                mock.patch.object(events, '_trim_in_background') as trim:
+            for _ in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    events.publish(events.CREATED, [(1, self.user.pk)])
+            self.assertEqual(trim.call_count, 1)
+            with mock.patch.object(events.time, 'monotonic', return_value=time.monotonic() + events.TRIM_INTERVAL):
+                with self.captureOnCommitCallbacks(execute=True):
+                    events.publish(events.CREATED, [(1, self.user.pk)])
+            self.assertEqual(trim.call_count, 2)
+
+    def test_trim_removes_events_past_retention(self):
+        events.publish(events.CREATED, [(1, self.user.pk), (2, self.user.pk)])
+        DatasetEvent.objects.filter(dataset_id=1).update(created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(events.trim(), 1)
+        self.assertEqual(list(DatasetEvent.objects.values_list('dataset_id', flat=True)), [2])
+
+
+class AuthTokenTests(APITestCase):
+    def login(self, **headers):
+        return self.client.post('/api/auth/token/', {'username': 'alice', 'password': 'pw', 'name': 'desktop'}, **headers)
+
+    def get(self, token, url='/api/datasets/'):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def setUp(self):
+        super().setUp()
+        self.client.logout()
+
+    def test_issue(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['username'], 'alice')
+        self.assertEqual(AuthToken.objects.get().name, 'desktop')
+        self.assertEqual(self.get(response.json()['token']).status_code, 200)
+        self.assertEqual(self.client.post('/api/auth/token/', {'username': 'alice', 'password': 'no'}).status_code, 401)
+        self.assertEqual(self.get('made-up').status_code, 401)
+
+    def test_token_does_not_renew_itself(self):
+        token = self.login().json()['token']
+        response = self.client.post('/api/auth/token/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 401)
+
+    def test_expired_token(self):
+        token = self.login().json()['token']
+        AuthToken.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.get(token).status_code, 401)
+        # Logging in again works with the stale token still sent along
+        response = self.login(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get(response.json()['token']).status_code, 200)
+        self.assertEqual(auth.purge_expired(), 1)
+
+    def test_revoke(self):
+        token, other = self.login().json()['token'], self.login().json()['token']
+        response = self.client.delete('/api/auth/token/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.json(), {'revoked': 1})
+        self.assertEqual(self.get(token).status_code, 401)
+        self.assertEqual(self.get(other).status_code, 200)
+
+    def test_revoke_all(self):
+        tokens = [self.login().json()['token'] for _ in range(3)]
+        User.objects.create_user('bob', password='pw')
+        self.client.post('/api/auth/token/', {'username': 'bob', 'password': 'pw'})
+        response = self.client.delete('/api/auth/token/?all=1', HTTP_AUTHORIZATION=f'Bearer {tokens[0]}')
+        self.assertEqual(response.json(), {'revoked': 3})
+        self.assertTrue(all(self.get(t).status_code == 401 for t in tokens))
+        self.assertEqual(AuthToken.objects.get().user.username, 'bob')
@@ -1,10 +1,19 @@
 from django.urls import path
-from .views import UploadCSVView, DatasetListView, DatasetDetailView, GeneratePDFView, RegisterView
+from .views import AuthTokenView, UploadCSVView, BulkUploadView, DatasetListView, DatasetEventsView, DatasetCompareView, DatasetTrendView, DatasetDetailView, DatasetStatusView, DatasetAppendView, DatasetRowsView, GeneratePDFView, RegisterView, SchemaView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
+    path('auth/token/', AuthTokenView.as_view(), name='auth-token'),
+    path('schema/', SchemaView.as_view(), name='schema'),
     path('upload/', UploadCSVView.as_view(), name='upload-csv'),
+    path('upload/bulk/', BulkUploadView.as_view(), name='upload-bulk'),
     path('datasets/', DatasetListView.as_view(), name='datasets-list'),
+    path('datasets/events/', DatasetEventsView.as_view(), name='datasets-events'),
+    path('datasets/compare/', DatasetCompareView.as_view(), name='datasets-compare'),
+    path('datasets/trend/', DatasetTrendView.as_view(), name='datasets-trend'),
     path('datasets/<int:pk>/', DatasetDetailView.as_view(), name='dataset-detail'),
+    path('datasets/<int:pk>/status/', DatasetStatusView.as_view(), name='dataset-status'),
+    path('datasets/<int:pk>/append/', DatasetAppendView.as_view(), name='dataset-append'),
+    path('datasets/<int:pk>/rows/', DatasetRowsView.as_view(), name='dataset-rows'),
     path('datasets/<int:pk>/pdf/', GeneratePDFView.as_view(), name='dataset-pdf'),
 ]
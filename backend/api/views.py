@@ -1,114 +1,589 @@
-import io
-import pandas as pd
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+import shutil
+import tempfile
+import time
+from functools import partial
+from asgiref.sync import sync_to_async
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.permissions import AllowAny
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.files import File
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from .models import Dataset
-from .serializers import DatasetSerializer, UserSerializer
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from .auth import TokenAuthentication, issue_token
+from .models import AuthToken, ColumnSchema, Dataset
+from .serializers import DatasetSerializer, DatasetStatusSerializer, UserSerializer
+from . import bulk, cache, columnar, compare, dedup, events, jobs, reports, retention, rows
+from .append import AppendError, append_rows, fresh_stats
+from .filters import filter_datasets
+from .ingest import ingest_csv
+from .pagination import KeysetPagination
+from .schema import Schema, SchemaError
+from .stats import compute_stats
+from .storage import Uncompressed, is_gzip, strip_gz
+
+def user_schema(user):
+    stored = ColumnSchema.objects.filter(user=user).first()
+    return Schema.from_dict(stored.definition if stored else None)
+
+
+def request_schema(request):
+    """Schema sent with the upload, else the user's saved schema, else the default."""
+    raw = request.data.get('schema')
+    if not raw:
+        return user_schema(request.user)
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError as e:
+            raise SchemaError(f'Schema is not valid JSON: {str(e)}')
+    return Schema.from_dict(raw)
+
+
+def visible_datasets(user):
+    """Datasets `user` may see: admins see everyone's, regular users only their own."""
+    qs = Dataset.objects.select_related('uploaded_by')
+    if user.is_staff or user.is_superuser:
+        return qs
+    return qs.filter(uploaded_by=user)
+
+
+def prune_history(user):
+    """Apply the retention policy to `user`'s datasets; returns the pruned ids."""
+    return [pk for pk, _ in retention.prune(users=[user])]
 
-NUMERIC_COLS = ['Flowrate','Pressure','Temperature']
 
 class UploadCSVView(APIView):
     def post(self, request):
         csv_file = request.FILES.get('file')
         if not csv_file:
             return Response({'detail':'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        # .csv.gz uploads are kept compressed under the plain .csv name
+        csv_file.name = strip_gz(csv_file.name)
         try:
-            df = pd.read_csv(csv_file)
-        except Exception as e:
-            return Response({'detail':f'Error reading CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_count = len(df)
-        averages = {}
-        for col in NUMERIC_COLS:
-            if col in df.columns:
-                try:
-                    averages[col] = float(df[col].dropna().astype(float).mean()) if not df[col].dropna().empty else None
-                except Exception:
-                    averages[col] = None
-            else:
-                averages[col] = None
-        type_distribution = df['Type'].value_counts().to_dict() if 'Type' in df.columns else {}
+            schema = request_schema(request)
+        except SchemaError as e:
+            return Response({'detail':f'Invalid schema: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        summary = {
-            'total_count': int(total_count),
-            'averages': averages,
-            'type_distribution': type_distribution,
-        }
+        digest = dedup.content_hash(csv_file)
+        dataset = dedup.reuse(digest, schema.to_dict(), request.user)
+        if dataset is not None:
+            # Same bytes and schema as an earlier upload: nothing to parse or store
+            response_status = status.HTTP_201_CREATED
+        elif jobs.enabled():
+            # Store the raw upload now and summarize it on the worker pool
+            dataset = Dataset.objects.create(
+                file=Uncompressed(csv_file), status=Dataset.STATUS_PENDING, schema=schema.to_dict(),
+                content_hash=digest, uploaded_by=request.user,
+            )
+            transaction.on_commit(partial(jobs.enqueue, dataset.pk))
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            writer = columnar.ColumnarWriter(schema)
+            try:
+                stored, summary = ingest_csv(csv_file, sink=writer, schema=schema)
+                summary['stats'] = compute_stats(writer.finish())
+            except Exception as e:
+                writer.abort()
+                return Response({'detail':f'Error reading CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        csv_file.seek(0)
-        dataset = Dataset.objects.create(file=csv_file, summary=summary, uploaded_by=request.user)
+            try:
+                dataset = Dataset.objects.create(
+                    file=stored, summary=summary, schema=schema.to_dict(),
+                    content_hash=digest, uploaded_by=request.user,
+                )
+            except Exception:
+                writer.abort()
+                raise
+            finally:
+                stored.close()
+            writer.commit(dataset.pk)
+            response_status = status.HTTP_201_CREATED
 
-        # Keep only last 5 datasets per user
-        qs = Dataset.objects.filter(uploaded_by=request.user).order_by('-uploaded_at')
-        if qs.count() > 5:
-            for old in qs[5:]:
-                old.file.delete(save=False)
-                old.delete()
+        events.publish(events.CREATED, [(dataset.pk, request.user.pk)])
+        pruned = prune_history(request.user)
+        cache.invalidate(request.user.pk, dataset.pk, *pruned)
 
         serializer = DatasetSerializer(dataset)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=response_status)
+
+
+class BulkUploadView(APIView):
+    def post(self, request):
+        files = request.FILES.getlist('files') + request.FILES.getlist('file')
+        if not files:
+            return Response({'detail':'No files provided'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            schema = request_schema(request)
+        except SchemaError as e:
+            return Response({'detail':f'Invalid schema: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                inputs = bulk.collect_inputs(
+                    files, workdir, settings.BULK_UPLOAD_MAX_FILES, getattr(settings, 'BULK_UPLOAD_MAX_BYTES', None),
+                )
+            except bulk.BulkUploadError as e:
+                return Response({'detail':str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Same bytes and schema as an earlier upload, or as an earlier file in this
+            # request: a hash and an insert instead of a parse
+            schema_dict = schema.to_dict()
+            reused, first, repeats, readable = {}, {}, [], []
+            for n, item in enumerate(inputs):
+                if not item.path:
+                    continue
+                if item.digest in first:
+                    repeats.append(n)
+                    continue
+                dataset = dedup.reuse(item.digest, schema_dict, request.user)
+                if dataset is not None:
+                    reused[n] = dataset
+                    continue
+                first[item.digest] = n
+                readable.append(n)
+
+            # Parse every remaining file in parallel on the worker pool
+            outcomes = jobs.ingest_paths(
+                [inputs[n].path for n in readable],
+                [os.path.join(workdir, f'{n}.stored.gz') for n in readable],
+                schema_dict,
+            )
+            parsed = dict(zip(readable, outcomes))
+
+            results, new, caches, handles = [], [], [], []
+            for n, item in enumerate(inputs):
+                outcome = parsed.get(n, {'error': item.error})
+                results.append({'name': item.name, 'id': None, 'status': 'error', 'detail': outcome.get('error')})
+                if 'summary' in outcome:
+                    handle = open(outcome['stored'], 'rb')
+                    handles.append(handle)
+                    new.append(Dataset(
+                        file=File(handle, name=item.name), summary=outcome['summary'],
+                        schema=schema_dict, content_hash=item.digest, uploaded_by=request.user,
+                    ))
+                    caches.append((results[-1], outcome['cache']))
+            try:
+                for dataset in new:
+                    dataset.store_file()
+                created = Dataset.objects.bulk_create(new)
+            except Exception:
+                for _, path in caches:
+                    shutil.rmtree(path, ignore_errors=True)
+                raise
+            finally:
+                for handle in handles:
+                    handle.close()
+
+        for dataset, (result, path) in zip(created, caches):
+            columnar.commit_dir(path, dataset.pk)
+            result.update(id=dataset.pk, status='created', detail=None)
+        for n in repeats:
+            # The first copy is stored by now, unless it failed to parse
+            dataset = dedup.reuse(inputs[n].digest, schema_dict, request.user)
+            if dataset is None:
+                results[n]['detail'] = parsed.get(first.get(inputs[n].digest), {}).get('error')
+            else:
+                reused[n] = dataset
+        for n, dataset in reused.items():
+            results[n].update(id=dataset.pk, status='created', detail=None)
+        created = created + list(reused.values())
+
+        events.publish(events.CREATED, [(d.pk, request.user.pk) for d in created])
+        # Retention runs once for the whole batch
+        pruned = prune_history(request.user)
+        cache.invalidate(request.user.pk, *(d.pk for d in created), *pruned)
+
+        elapsed = time.perf_counter() - start
+        return Response({
+            'results': results,
+            'created': len(created),
+            'failed': len(results) - len(created),
+            'pruned': pruned,
+            'seconds': round(elapsed, 3),
+            'files_per_second': round(len(results) / elapsed, 2) if elapsed else None,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
 
 
 class DatasetListView(generics.ListAPIView):
+    """
+    Without `limit`/`cursor` this is the plain list of the last 5 datasets;
+    with them, keyset pages of the whole (filtered) history. `fields`
+    selects a subset of the serializer fields, e.g. `fields=id,uploaded_at,status`.
+    """
     serializer_class = DatasetSerializer
+    pagination_class = KeysetPagination
+    history_size = 5
+
+    def get(self, request, *args, **kwargs):
+        scope = cache.user_scope(request.user)
+        return cache.cached_json(
+            request, f'list:{scope}:{cache.query_key(request)}', scope, lambda: (self.list(request, *args, **kwargs).data, None)
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset[:self.history_size], many=True).data)
+
+    def requested_fields(self):
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        fields = [f for f in raw.split(',') if f]
+        unknown = set(fields) - set(DatasetSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_staff or user.is_superuser:
-            # Admin users see all datasets from all users
-            return Dataset.objects.order_by('-uploaded_at')[:5]
-        else:
-            # Regular users see only their own datasets
-            return Dataset.objects.filter(uploaded_by=user).order_by('-uploaded_at')[:5]
+        queryset = filter_datasets(visible_datasets(self.request.user), self.request.query_params)
+        fields = self.requested_fields()
+        if fields is not None:
+            # Don't even load the JSON columns that won't be serialized
+            queryset = queryset.defer(*(f for f in ('summary', 'schema') if f not in fields))
+        return queryset.order_by('-uploaded_at', '-id')
 
 
 class DatasetDetailView(generics.RetrieveAPIView):
     serializer_class = DatasetSerializer
+    cache_prefix = 'detail'
+
+    def get(self, request, *args, **kwargs):
+        pk = kwargs['pk']
+        user = request.user
+
+        def build():
+            try:
+                dataset = self.get_object()
+            except Http404:
+                return None
+            return self.get_serializer(dataset).data, {'owner_id': dataset.uploaded_by_id}
+
+        def allow(meta):
+            return user.is_staff or user.is_superuser or meta['owner_id'] == user.pk
+
+        response = cache.cached_json(request, f'{self.cache_prefix}:{pk}', f'ds:{pk}', build, allow)
+        # Not found, or cached for someone else: take the regular (404) path
+        return response or super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_staff or user.is_superuser:
-            return Dataset.objects.all()
+        return visible_datasets(self.request.user)
+
+
+class DatasetStatusView(DatasetDetailView):
+    serializer_class = DatasetStatusSerializer
+    cache_prefix = 'status'
+
+
+class DatasetAppendView(APIView):
+    """
+    Append new rows (`file`: a CSV or .csv.gz with the dataset's header) to
+    a ready dataset; the summary is updated from stored aggregates, so the
+    cost depends on the new rows only. See api.append.
+    """
+
+    def post(self, request, pk):
+        csv_file = request.FILES.get('file')
+        if not csv_file:
+            return Response({'detail':'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        dataset = visible_datasets(request.user).filter(pk=pk).first()
+        if dataset is None:
+            return Response({'detail':'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        if dataset.status != Dataset.STATUS_READY:
+            return Response({'detail':f'Dataset is {dataset.status}', 'status': dataset.status}, status=status.HTTP_409_CONFLICT)
+
+        try:
+            dataset, appended = append_rows(dataset, csv_file)
+        except AppendError as e:
+            return Response({'detail':str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'detail':f'Error reading CSV: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        reports.delete(dataset.pk)
+        events.publish(events.UPDATED, [(dataset.pk, dataset.uploaded_by_id)])
+
+        # The dataset grew, which counts against the byte budget
+        pruned = prune_history(dataset.uploaded_by)
+        cache.invalidate(dataset.uploaded_by_id, dataset.pk, *pruned)
+        return Response({'appended': appended, **DatasetSerializer(dataset).data})
+
+
+def request_user(request):
+    """Authenticate a plain Django request the way the API views do (Basic or session auth)."""
+    return APIView().initialize_request(request).user
+
+
+class DatasetEventsView(View):
+    """
+    Server-sent events announcing the user's datasets (everyone's for
+    admins) as they are created, processed, updated or deleted, with the
+    dataset in `data`. Reconnecting clients send `Last-Event-ID` (or
+    `?last_event_id=`) to receive what they missed. See api.events.
+    """
+
+    async def get(self, request):
+        try:
+            user = await sync_to_async(request_user)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({'detail':str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if not user.is_authenticated:
+            return JsonResponse({'detail':'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+        raw = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(raw) if raw else None
+        except ValueError:
+            return JsonResponse({'detail':'Last-Event-ID must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if isinstance(request, ASGIRequest):
+            body = events.stream(user, last_event_id)
         else:
-            return Dataset.objects.filter(uploaded_by=user)
+            # A WSGI server would buffer an async iterator completely
+            body = events.stream_sync(user, last_event_id)
+        response = StreamingHttpResponse(body, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
-class GeneratePDFView(APIView):
+class DatasetRowsView(APIView):
+    """
+    Parsed rows of a dataset, read from its columnar cache: column
+    projection, filters and offset pagination, or with `?downsample=`
+    at most `points` points per column for charting. See api.rows.
+    """
+
     def get(self, request, pk):
+        user = request.user
+
+        def build():
+            dataset = visible_datasets(user).filter(pk=pk).first()
+            if dataset is None or dataset.status != Dataset.STATUS_READY:
+                return None
+            table = columnar.table_for(dataset)
+            params = request.query_params
+            data = rows.downsample(table, params) if params.get('downsample') else rows.page(table, params)
+            return data, {'owner_id': dataset.uploaded_by_id}
+
+        def allow(meta):
+            return user.is_staff or user.is_superuser or meta['owner_id'] == user.pk
+
+        response = cache.cached_json(request, f'rows:{pk}:{cache.query_key(request)}', f'ds:{pk}', build, allow)
+        if response is not None:
+            return response
+        dataset = visible_datasets(user).filter(pk=pk).first()
+        if dataset is None:
+            return Response({'detail':'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'detail':f'Dataset is {dataset.status}', 'status': dataset.status}, status=status.HTTP_409_CONFLICT)
+
+
+class DatasetCompareView(APIView):
+    """`?ids=3,5,8[&baseline=5]`: aligned stats of several datasets with deltas against the baseline."""
+
+    def get(self, request):
+        try:
+            ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i]
+        except ValueError:
+            return Response({'detail':'ids must be a comma-separated list of dataset ids'}, status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if len(ids) < 2:
+            return Response({'detail':'Give at least two dataset ids to compare'}, status=status.HTTP_400_BAD_REQUEST)
+        baseline = request.query_params.get('baseline', str(ids[0]))
+        if baseline not in map(str, ids):
+            return Response({'detail':'baseline must be one of ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build():
+            found = visible_datasets(request.user).in_bulk(ids)
+            if len(found) < len(ids) or any(d.status != Dataset.STATUS_READY for d in found.values()):
+                return None
+            return compare.compare([found[i] for i in ids], baseline=ids.index(int(baseline))), None
+
+        scope = cache.user_scope(request.user)
+        response = cache.cached_json(request, f'compare:{scope}:{cache.query_key(request)}', scope, build)
+        if response is not None:
+            return response
+        found = visible_datasets(request.user).in_bulk(ids)
+        missing = [i for i in ids if i not in found]
+        if missing:
+            return Response({'detail':f"Datasets not found: {', '.join(map(str, missing))}"}, status=status.HTTP_404_NOT_FOUND)
+        busy = [i for i in ids if found[i].status != Dataset.STATUS_READY]
+        return Response({'detail':f"Datasets not ready: {', '.join(map(str, busy))}"}, status=status.HTTP_409_CONFLICT)
+
+
+class DatasetTrendView(APIView):
+    """
+    Rolling trend of per-upload averages over the whole visible history,
+    read from the stored summaries only. `?window=` (default 3) plus the
+    dataset list filters (`user`, `uploaded_after`, `type`, ...).
+    """
+
+    def get(self, request):
         try:
-            dataset = Dataset.objects.get(pk=pk)
-        except Dataset.DoesNotExist:
+            window = int(request.query_params.get('window', 3))
+        except ValueError:
+            return Response({'detail':'window must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if window < 1:
+            return Response({'detail':'window must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build():
+            queryset = filter_datasets(visible_datasets(request.user), request.query_params)
+            history = queryset.filter(status=Dataset.STATUS_READY).order_by('uploaded_at', 'id').values_list(
+                'id', 'uploaded_at', 'summary__total_count', 'summary__averages'
+            )
+            return compare.trend(list(history), window), None
+
+        scope = cache.user_scope(request.user)
+        return cache.cached_json(request, f'trend:{scope}:{cache.query_key(request)}', scope, build)
+
+
+class GeneratePDFView(APIView):
+    def get(self, request, pk):
+        dataset = visible_datasets(request.user).filter(pk=pk).first()
+        if dataset is None:
             return Response({'detail':'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        if dataset.status != Dataset.STATUS_READY:
+            return Response({'detail':f'Dataset is {dataset.status}', 'status': dataset.status}, status=status.HTTP_409_CONFLICT)
+        if (dataset.summary.get('stats') or {}).get('percentiles_stale'):
+            # The report prints them, and is named after the summary they are stored in
+            fresh_stats(dataset)
+            dataset.refresh_from_db()
 
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        p.setFont('Helvetica', 12)
-        p.drawString(50, 750, f"Dataset Report - ID: {dataset.id}")
-        p.drawString(50, 735, f"Uploaded at: {dataset.uploaded_at}")
-
-        y = 700
-        p.drawString(50, y, 'Summary:')
-        y -= 20
-        for k,v in dataset.summary.items():
-            p.drawString(60, y, f"{k}: {v}")
-            y -= 18
-            if y < 50:
-                p.showPage()
-                y = 750
-        p.save()
-        buffer.seek(0)
-        
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="dataset_{dataset.id}_report.pdf"'
+        etag = reports.report_etag(dataset)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            # The client's copy is current: no need to build or even open the report
+            response = HttpResponse(status=304)
+        else:
+            try:
+                report = reports.open_report(dataset)
+            except FileNotFoundError:
+                jobs.build_report(dataset)
+                report = reports.open_report(dataset)
+            # Served from the report cache and streamed in blocks rather than copied into memory
+            response = FileResponse(
+                report, as_attachment=True,
+                filename=f"dataset_{dataset.id}_report.pdf", content_type='application/pdf',
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         return response
 
 
+def serve_media(request, path):
+    """
+    Server for stored datasets, authenticated like the API and limited to
+    the files of datasets the user may see. Compressed files go out as
+    stored with Content-Encoding: gzip when the client accepts it and are
+    inflated on the fly otherwise, so downloads look exactly like the
+    uploaded CSV either way.
+    """
+    try:
+        user = request_user(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail':str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if not user.is_authenticated:
+        return JsonResponse({'detail':'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    storage = Dataset._meta.get_field('file').storage
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..') or not visible_datasets(user).filter(file=path).exists() or not storage.exists(path):
+        raise Http404(path)
+    raw = storage.open_raw(path) if hasattr(storage, 'open_raw') else storage.open(path, 'rb')
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if not is_gzip(raw):
+        return FileResponse(raw, content_type=content_type)
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = FileResponse(raw, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        inflated = gzip.GzipFile(fileobj=raw, mode='rb')
+        response = StreamingHttpResponse(iter(partial(inflated.read, 64 * 1024), b''), content_type=content_type)
+        response._resource_closers.append(raw.close)
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+class SchemaView(APIView):
+    def get(self, request):
+        return Response(user_schema(request.user).to_dict())
+
+    def put(self, request):
+        try:
+            schema = Schema.from_dict(request.data)
+        except SchemaError as e:
+            return Response({'detail':f'Invalid schema: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
+        ColumnSchema.objects.update_or_create(user=request.user, defaults={'definition': schema.to_dict()})
+        return Response(schema.to_dict())
+
+    def delete(self, request):
+        # Back to the built-in default schema
+        ColumnSchema.objects.filter(user=request.user).delete()
+        return Response(user_schema(request.user).to_dict())
+
+
+class AuthTokenView(APIView):
+    """
+    POST `username` and `password` (or Basic credentials) for an API token to
+    send as `Authorization: Bearer <token>` until it expires. DELETE revokes
+    the token the request was made with, or every token of the user with `?all=1`.
+    """
+
+    def get_authenticators(self):
+        authenticators = super().get_authenticators()
+        if self.request.method == 'POST':
+            # A token does not renew itself, and a stale one sent along must not
+            # fail the login before the password is checked
+            return [a for a in authenticators if not isinstance(a, TokenAuthentication)]
+        return authenticators
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [AllowAny()]
+        return super().get_permissions()
+
+    def post(self, request):
+        if 'username' in request.data:
+            user = authenticate(request, username=request.data.get('username'), password=request.data.get('password'))
+        elif request.user.is_authenticated:
+            user = request.user
+        else:
+            user = None
+        if user is None:
+            return Response({'detail': 'Invalid username or password'}, status=status.HTTP_401_UNAUTHORIZED)
+        token, record = issue_token(user, str(request.data.get('name', '')))
+        return Response({
+            'token': token,
+            'expires_at': record.expires_at,
+            'username': user.username,
+            'is_staff': user.is_staff or user.is_superuser,
+        }, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        if request.query_params.get('all') in ('1', 'true'):
+            revoked = AuthToken.objects.filter(user=request.user).delete()[0]
+        elif isinstance(request.auth, AuthToken):
+            revoked = AuthToken.objects.filter(pk=request.auth.pk).delete()[0]
+        else:
+            return Response({'detail': 'Not authenticated with a token'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'revoked': revoked})
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
 
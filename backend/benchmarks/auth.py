@@ -0,0 +1,147 @@
+"""
+Requests/sec on the dataset list with Basic auth (a PBKDF2 password check
+per request) against a Bearer token from POST /api/auth/token/ (one
+indexed lookup), with the response cache on so authentication is what
+differs.
+
+By default requests go through Django's test client against a scratch test
+database; with --url they go over HTTP to a running server, from
+--concurrency threads with a keep-alive connection each.
+
+    python -m benchmarks.auth --requests 200
+    python -m benchmarks.auth --url http://localhost:8000 --user admin --password admin --concurrency 8
+"""
+import argparse
+import base64
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import django
+
+
+def measure(send, count, concurrency=1):
+    """Calls `send()` `count` times over `concurrency` threads; returns requests/sec."""
+    per_thread = [count // concurrency + (i < count % concurrency) for i in range(concurrency)]
+    errors = []
+
+    def worker(n):
+        try:
+            for _ in range(n):
+                send()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return count / elapsed
+
+
+def in_process(count):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chem_visualizer.settings')
+    os.environ['UPLOAD_WORKERS'] = '0'
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    tmp = tempfile.mkdtemp()
+    overrides = override_settings(
+        MEDIA_ROOT=tmp, REPORT_CACHE_ROOT=os.path.join(tmp, 'reports'), ALLOWED_HOSTS=['*'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    overrides.enable()
+    try:
+        User.objects.create_user('bench', password='bench-password')
+        client = Client()
+        response = client.post('/api/auth/token/', {'username': 'bench', 'password': 'bench-password'},
+                               content_type='application/json')
+        token = response.json()['token']
+        basic = 'Basic ' + base64.b64encode(b'bench:bench-password').decode()
+
+        def get(authorization):
+            def send():
+                response = client.get('/api/datasets/', HTTP_AUTHORIZATION=authorization)
+                assert response.status_code == 200, response.status_code
+            return send
+
+        # SQLite test databases live in memory, on one connection: no concurrency in-process
+        return {
+            'basic': measure(get(basic), count),
+            'token': measure(get(f'Bearer {token}'), count),
+        }
+    finally:
+        overrides.disable()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def against_server(count, concurrency, url, username, password):
+    parts = urlsplit(url)
+    local = threading.local()
+
+    def request(method, path, headers, body=None):
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        local.conn.request(method, path, body=body, headers=headers)
+        response = local.conn.getresponse()
+        data = response.read()
+        if response.status >= 400:
+            raise RuntimeError(f'{method} {path}: HTTP {response.status} {data[:200]!r}')
+        return data
+
+    issued = json.loads(request(
+        'POST', '/api/auth/token/', {'Content-Type': 'application/json'},
+        json.dumps({'username': username, 'password': password, 'name': 'benchmark'}),
+    ))
+    basic = 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+    try:
+        return {
+            scheme: measure(lambda: request('GET', '/api/datasets/', {'Authorization': authorization}), count, concurrency)
+            for scheme, authorization in (('basic', basic), ('token', f"Bearer {issued['token']}"))
+        }
+    finally:
+        request('DELETE', '/api/auth/token/', {'Authorization': f"Bearer {issued['token']}"})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads (--url only).')
+    parser.add_argument('--url', help='Base URL of a running server; default uses the test client in-process.')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--json', action='store_true', help='Print the results as one JSON object.')
+    args = parser.parse_args()
+
+    if args.url:
+        rates = against_server(args.requests, args.concurrency, args.url.rstrip('/'), args.user, args.password)
+    else:
+        rates = in_process(args.requests)
+    speedup = rates['token'] / rates['basic']
+    if args.json:
+        print(json.dumps({'basic_rps': round(rates['basic'], 1), 'token_rps': round(rates['token'], 1),
+                          'speedup': round(speedup, 1)}))
+    else:
+        print(f"GET /api/datasets/ x{args.requests}")
+        print(f"  basic  {rates['basic']:8.1f} req/s")
+        print(f"  token  {rates['token']:8.1f} req/s  ({speedup:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
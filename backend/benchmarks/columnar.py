@@ -0,0 +1,65 @@
+"""
+Compare re-parsing a stored CSV against loading the columnar cache.
+
+    python -m benchmarks.columnar --sizes 10MB 200MB
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from django.conf import settings
+
+from benchmarks.ingest import parse_size, write_csv
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', default=['10MB', '200MB'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.configure(MEDIA_ROOT=tmp)
+        from api import columnar
+        from api.ingest import summarize_csv
+        from api.schema import Schema
+
+        schema = Schema.from_dict(None)
+        numeric_cols = schema.numeric_cols
+
+        for pk, size in enumerate(args.sizes):
+            path = os.path.join(tmp, f'bench_{size}.csv')
+            write_csv(path, parse_size(size))
+            writer = columnar.ColumnarWriter(schema)
+            with open(path, 'rb') as f:
+                summarize_csv(f, sink=writer)
+            writer.commit(pk)
+
+            def reparse():
+                df = pd.read_csv(path)
+                return [df[c].astype(float).to_numpy().sum() for c in numeric_cols], df['Type'].value_counts()
+
+            def cached():
+                df = columnar.load(pk).frame()
+                return [df[c].to_numpy().sum() for c in numeric_cols], df['Type'].value_counts()
+
+            csv_s = timed(reparse, args.repeat)
+            cache_s = timed(cached, args.repeat)
+            cache_mb = sum(e.stat().st_size for e in os.scandir(columnar.cache_dir(pk))) / 1024 ** 2
+            print(f'{size:>6}  csv re-parse {csv_s:7.3f}s  cached load {cache_s:7.3f}s  '
+                  f'({csv_s / cache_s:5.1f}x, cache {cache_mb:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
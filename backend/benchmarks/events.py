@@ -0,0 +1,252 @@
+"""
+Hold many idle subscribers on the dataset event stream, then measure how
+long one new dataset takes to reach all of them, the memory per
+connection and how often the server polls the database while they idle.
+
+By default the ASGI application is driven in-process against a scratch
+test database; with --url the subscribers connect to a running server
+(e.g. `uvicorn chem_visualizer.asgi:application`) instead, and an upload
+is made through its API.
+
+    python -m benchmarks.events --subscribers 100 1000
+    python -m benchmarks.events --subscribers 500 --url http://localhost:8000 --user admin --password admin
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+import django
+
+CSV = b'Type,Flowrate,Pressure,Temperature\nPump,1,2,3\nValve,4,5,6\n'
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 ** 2
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class Subscriber:
+    """One event stream connection, recording when the first `created` event arrives."""
+
+    def __init__(self):
+        self.connected = asyncio.Event()
+        self.created_at = None
+        self.buffer = ''
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if not self.connected.is_set() and 'retry:' in self.buffer:
+            self.connected.set()
+        if self.created_at is None and 'event: created' in self.buffer:
+            self.created_at = time.perf_counter()
+        # Only the tail can still hold a partial event
+        self.buffer = self.buffer[-64:]
+
+
+async def asgi_subscriber(application, headers, subscriber, stop):
+    path = '/api/datasets/events/'
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await stop.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            subscriber.feed(message.get('body', b'').decode())
+
+    await application(scope, receive, send)
+
+
+async def http_subscriber(url, authorization, subscriber, stop):
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    writer.write((
+        f'GET /api/datasets/events/ HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+        f'Authorization: {authorization}\r\nAccept: text/event-stream\r\n\r\n'
+    ).encode())
+    await writer.drain()
+    try:
+        while not stop.is_set():
+            read = asyncio.ensure_future(reader.read(65536))
+            halt = asyncio.ensure_future(stop.wait())
+            done, _ = await asyncio.wait({read, halt}, return_when=asyncio.FIRST_COMPLETED)
+            if read not in done:
+                read.cancel()
+                break
+            halt.cancel()
+            chunk = read.result()
+            if not chunk:
+                break
+            subscriber.feed(chunk.decode(errors='replace'))
+    finally:
+        writer.close()
+
+
+async def run(count, connect, publish, idle, count_polls=None):
+    stop = asyncio.Event()
+    subscribers = [Subscriber() for _ in range(count)]
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(connect(s, stop)) for s in subscribers]
+    await asyncio.wait_for(asyncio.gather(*(s.connected.wait() for s in subscribers)), 120)
+    connect_s = time.perf_counter() - start
+    per_conn_kb = (rss_mb() - base_rss) * 1024 / count
+
+    polls_before = count_polls() if count_polls else None
+    await asyncio.sleep(idle)
+    polls = count_polls() - polls_before if count_polls else None
+
+    published = time.perf_counter()
+    await publish()
+    await asyncio.wait_for(asyncio.gather(*(_created(s) for s in subscribers)), 60)
+    latencies = [(s.created_at - published) * 1000 for s in subscribers]
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        'subscribers': count,
+        'connect_seconds': round(connect_s, 3),
+        'rss_kb_per_subscriber': round(per_conn_kb, 1),
+        'idle_seconds': idle,
+        'idle_polls': polls,
+        'fanout_ms_p50': round(percentile(latencies, 50), 1),
+        'fanout_ms_p99': round(percentile(latencies, 99), 1),
+        'fanout_ms_max': round(max(latencies), 1),
+    }
+
+
+async def _created(subscriber):
+    while subscriber.created_at is None:
+        await asyncio.sleep(0.005)
+
+
+def in_process(counts, idle):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chem_visualizer.settings')
+    os.environ['UPLOAD_WORKERS'] = '0'
+    django.setup()
+    from asgiref.sync import sync_to_async
+    from django.contrib.auth.models import User
+    from django.core.files.base import ContentFile
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from api import events
+    from chem_visualizer.asgi import application
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    tmp = tempfile.mkdtemp()
+    overrides = override_settings(
+        MEDIA_ROOT=tmp, REPORT_CACHE_ROOT=os.path.join(tmp, 'reports'), ALLOWED_HOSTS=['*'],
+        PRERENDER_REPORTS=False, CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    overrides.enable()
+    polls = [0]
+    fetch = events.fetch
+
+    def counting_fetch(*args, **kwargs):
+        polls[0] += 1
+        return fetch(*args, **kwargs)
+
+    events.fetch = counting_fetch
+    try:
+        user = User.objects.create_user('subscriber', password='pw')
+        client = Client()
+        client.force_login(user)
+        # Session cookie rather than Basic auth: password hashing per connection would dominate
+        headers = [(b'host', b'testserver'), (b'cookie', f'sessionid={client.cookies["sessionid"].value}'.encode())]
+
+        def upload():
+            response = client.post('/api/upload/', {'file': ContentFile(CSV, name='bench.csv')})
+            assert response.status_code == 201, response.status_code
+
+        results = []
+        for count in counts:
+            results.append(asyncio.run(run(
+                count,
+                lambda s, stop: asgi_subscriber(application, headers, s, stop),
+                sync_to_async(upload),
+                idle,
+                lambda: polls[0],
+            )))
+        return results
+    finally:
+        events.fetch = fetch
+        overrides.disable()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def against_server(counts, idle, url, username, password):
+    import requests
+
+    authorization = 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+    def upload():
+        response = requests.post(f'{url}/api/upload/', files={'file': ('bench.csv', CSV)}, auth=(username, password))
+        response.raise_for_status()
+
+    results = []
+    for count in counts:
+        results.append(asyncio.run(run(
+            count,
+            lambda s, stop: http_subscriber(url, authorization, s, stop),
+            lambda: asyncio.to_thread(upload),
+            idle,
+        )))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--subscribers', nargs='+', type=int, default=[100, 1000])
+    parser.add_argument('--idle', type=float, default=5.0, help='Seconds to hold the idle connections before publishing.')
+    parser.add_argument('--url', help='Base URL of a running server; default drives the ASGI app in-process.')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per run.')
+    args = parser.parse_args()
+
+    if args.url:
+        # The client side of this many connections needs its file descriptors
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, min(hard, max(args.subscribers) + 256)), hard))
+        results = against_server(args.subscribers, args.idle, args.url.rstrip('/'), args.user, args.password)
+    else:
+        results = in_process(args.subscribers, args.idle)
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            polls = '' if result['idle_polls'] is None else f"  {result['idle_polls']:>3} polls in {result['idle_seconds']:g}s idle"
+            print(
+                f"{result['subscribers']:>6} subscribers  connect {result['connect_seconds']:6.2f}s  "
+                f"{result['rss_kb_per_subscriber']:6.1f} KB each{polls}  fan-out p50 {result['fanout_ms_p50']:7.1f} ms  "
+                f"p99 {result['fanout_ms_p99']:7.1f} ms  max {result['fanout_ms_max']:7.1f} ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare peak RSS and wall time of the old whole-file `pd.read_csv` summary
+against the upload path: the chunked `api.ingest.ingest_csv` into the
+columnar cache, then `api.stats.compute_stats` over it (peak RSS is shown
+after each step).
+
+    python -m benchmarks.ingest --sizes 10MB 1GB
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+TYPES = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.upper()
+    for unit, mult in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * mult)
+    return int(text)
+
+
+def write_csv(path, size):
+    rng = random.Random(0)
+    with open(path, 'w') as f:
+        f.write('Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+        i = 0
+        while f.tell() < size:
+            rows = []
+            for _ in range(10_000):
+                t = rng.choice(TYPES)
+                i += 1
+                rows.append(f'{t}-{i},{t},{rng.uniform(50, 170):.1f},{rng.uniform(4, 9):.2f},{rng.uniform(90, 145):.1f}\n')
+            f.writelines(rows)
+
+
+def run_legacy(path):
+    import pandas as pd
+    df = pd.read_csv(path)
+    averages = {c: float(df[c].dropna().astype(float).mean()) for c in ['Flowrate', 'Pressure', 'Temperature']}
+    df['Type'].value_counts().to_dict()
+    # the old view re-read the upload to store it
+    with open(path, 'rb') as src, tempfile.TemporaryFile() as dst:
+        dst.write(src.read())
+    return averages
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_streaming(path):
+    from django.conf import settings
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.configure(MEDIA_ROOT=tmp)
+        from django.core.files import File
+        from api import columnar
+        from api.ingest import ingest_csv
+        from api.schema import Schema
+        from api.stats import compute_stats
+        writer = columnar.ColumnarWriter(Schema.from_dict(None))
+        with open(path, 'rb') as f:
+            stored, summary = ingest_csv(File(f, name=os.path.basename(path)), sink=writer)
+            stored.close()
+        ingest_mb = peak_rss_mb()
+        summary['stats'] = compute_stats(writer.finish())
+        writer.abort()
+    return {'ingest_rss_mb': ingest_mb}
+
+
+def child(mode, path):
+    start = time.perf_counter()
+    extra = {'legacy': run_legacy, 'streaming': run_streaming}[mode](path)
+    elapsed = time.perf_counter() - start
+    result = {'seconds': elapsed, 'peak_rss_mb': peak_rss_mb()}
+    if isinstance(extra, dict):
+        result.update(extra)
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', default=['10MB', '1GB'])
+    parser.add_argument('--modes', nargs='+', default=['legacy', 'streaming'])
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'bench_{size}.csv')
+            write_csv(path, parse_size(size))
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.ingest', '--child', mode, path],
+                    capture_output=True, text=True, check=True,
+                )
+                result = json.loads(out.stdout)
+                steps = f"  (after ingest {result['ingest_rss_mb']:.1f} MB)" if 'ingest_rss_mb' in result else ''
+                print(f"{size:>6} {mode:>9}  {result['seconds']:8.2f}s  peak RSS {result['peak_rss_mb']:8.1f} MB{steps}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""
+Concurrent upload + list load test: client threads log in for a token and
+then, until the time is up, either upload a small CSV or list datasets
+(--upload-ratio of the requests are uploads). Reports requests/sec and
+latency percentiles per operation, so throughput can be compared as the
+number of web workers grows.
+
+By default each --workers count gets a fresh data directory (SQLite in WAL
+mode, file cache), migrated and served by `serve.py` with DEBUG off; with
+--url the load goes to a server that is already running instead (e.g. one
+on PostgreSQL).
+
+    python -m benchmarks.load --workers 1 2 4 --clients 16 --duration 20
+    python -m benchmarks.load --url http://localhost:8000 --user admin --password admin --clients 32
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import secrets
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TYPES = ['Pump', 'Valve', 'Compressor', 'HeatExchanger', 'Reactor', 'Condenser']
+
+
+def make_csv(rows):
+    lines = ['Equipment Name,Type,Flowrate,Pressure,Temperature']
+    for i in range(rows):
+        lines.append(f'E-{i},{random.choice(TYPES)},{random.uniform(50, 300):.1f},'
+                     f'{random.uniform(1, 20):.2f},{random.uniform(80, 400):.1f}')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def multipart(field, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+class Client:
+    """One keep-alive connection to the server."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=120)
+        self.headers = {}
+
+    def request(self, method, path, body=None, headers=None):
+        self.conn.request(method, path, body=body, headers={**self.headers, **(headers or {})})
+        response = self.conn.getresponse()
+        data = response.read()
+        if response.status >= 400:
+            raise RuntimeError(f'{method} {path}: HTTP {response.status} {data[:200]!r}')
+        return data
+
+    def login(self, username, password):
+        issued = json.loads(self.request(
+            'POST', '/api/auth/token/', json.dumps({'username': username, 'password': password, 'name': 'load-test'}),
+            {'Content-Type': 'application/json'},
+        ))
+        self.headers['Authorization'] = f"Bearer {issued['token']}"
+
+
+def run_load(url, username, password, clients, duration, upload_ratio, rows):
+    latencies = {'upload': [], 'list': []}
+    errors = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+    go = threading.Event()
+    state = {}
+
+    def worker():
+        client = Client(url)
+        try:
+            client.login(username, password)
+        finally:
+            ready.wait()
+        go.wait()
+        mine = {'upload': [], 'list': []}
+        while time.perf_counter() < state['deadline']:
+            op = 'upload' if random.random() < upload_ratio else 'list'
+            start = time.perf_counter()
+            try:
+                if op == 'upload':
+                    body, content_type = multipart('file', 'load.csv', make_csv(rows))
+                    client.request('POST', '/api/upload/', body, {'Content-Type': content_type})
+                else:
+                    client.request('GET', '/api/datasets/')
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                client = Client(url)
+                client.login(username, password)
+                continue
+            mine[op].append((time.perf_counter() - start) * 1000)
+        with lock:
+            for op, values in mine.items():
+                latencies[op].extend(values)
+        try:
+            client.request('DELETE', '/api/auth/token/')
+        except Exception:
+            pass
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    start = time.perf_counter()
+    state['deadline'] = start + duration
+    go.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = {'clients': clients, 'seconds': round(elapsed, 2), 'errors': len(errors)}
+    total = 0
+    for op, values in latencies.items():
+        total += len(values)
+        result[f'{op}_rps'] = round(len(values) / elapsed, 1)
+        result[f'{op}_ms_p50'] = round(percentile(values, 50), 1)
+        result[f'{op}_ms_p99'] = round(percentile(values, 99), 1)
+    result['total_rps'] = round(total / elapsed, 1)
+    if errors:
+        result['first_error'] = errors[0]
+    return result
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'serve.py exited with {proc.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Server did not start')
+
+
+def with_local_server(workers, run):
+    """Migrate a scratch data directory, serve it with `workers` web workers and call `run(url)`."""
+    tmp = tempfile.mkdtemp()
+    env = dict(
+        os.environ, DJANGO_SETTINGS_MODULE='chem_visualizer.settings', DJANGO_DEBUG='0',
+        DJANGO_SECRET_KEY=secrets.token_urlsafe(32), DJANGO_ALLOWED_HOSTS='127.0.0.1,localhost',
+        DJANGO_DATA_DIR=tmp,
+    )
+    env.pop('POSTGRES_DB', None)
+    try:
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '-v0'], cwd=BACKEND, env=env, check=True)
+        subprocess.run(
+            [sys.executable, '-c', 'import django; django.setup(); from django.contrib.auth.models import User; '
+                                   'User.objects.create_user("load", password="load")'],
+            cwd=BACKEND, env=env, check=True,
+        )
+        port = free_port()
+        proc = subprocess.Popen(
+            [sys.executable, 'serve.py', '--workers', str(workers), '--port', str(port)],
+            cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(port, proc)
+            return run(f'http://127.0.0.1:{port}', 'load', 'load')
+        finally:
+            proc.terminate()
+            proc.wait(30)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4], help='Web worker counts to compare.')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load per run.')
+    parser.add_argument('--upload-ratio', type=float, default=0.2)
+    parser.add_argument('--rows', type=int, default=200, help='Rows per uploaded CSV.')
+    parser.add_argument('--url', help='Base URL of a running server instead of starting serve.py.')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per run.')
+    args = parser.parse_args()
+
+    def load(url, username, password):
+        return run_load(url, username, password, args.clients, args.duration, args.upload_ratio, args.rows)
+
+    if args.url:
+        runs = [('-', load(args.url.rstrip('/'), args.user, args.password))]
+    else:
+        runs = [(workers, with_local_server(workers, load)) for workers in args.workers]
+    for workers, result in runs:
+        if args.json:
+            print(json.dumps({'workers': workers, **result}))
+        else:
+            print(
+                f"workers {workers:>2}  {result['total_rps']:7.1f} req/s  "
+                f"upload {result['upload_rps']:6.1f}/s p50 {result['upload_ms_p50']:7.1f} p99 {result['upload_ms_p99']:7.1f} ms  "
+                f"list {result['list_rps']:6.1f}/s p50 {result['list_ms_p50']:7.1f} p99 {result['list_ms_p99']:7.1f} ms  "
+                f"errors {result['errors']}"
+            )
+
+
+if __name__ == '__main__':
+    main()
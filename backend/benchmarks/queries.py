@@ -0,0 +1,99 @@
+"""
+Count the SQL queries each dataset endpoint issues as a user's history
+grows, and show the query plan of the per-user listing. Exits non-zero if
+any endpoint's query count depends on the history size; the fixed counts
+are also asserted by api.tests.QueryCountTests.
+
+    python -m benchmarks.queries --histories 5 50 500
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import django
+
+
+def seed(user, count):
+    from django.core.files.base import ContentFile
+    from api.models import Dataset
+
+    summary = {'total_count': 1, 'averages': {'Flowrate': 1.0}, 'type_distribution': {'A': 1}}
+    Dataset.objects.bulk_create([
+        Dataset(file=f'datasets/seed_{user.pk}_{i}.csv', size=10, summary=summary, uploaded_by=user)
+        for i in range(count)
+    ])
+    return ContentFile(b'Type,Flowrate,Pressure,Temperature\nA,1,2,3\nB,4,5,6\n', name='new.csv')
+
+
+def count_queries(client, method, url, **kwargs):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = getattr(client, method)(url, **kwargs)
+    assert response.status_code < 400, (url, response.status_code)
+    return len(ctx.captured_queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--histories', nargs='+', type=int, default=[5, 50, 500])
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chem_visualizer.settings')
+    os.environ['UPLOAD_WORKERS'] = '0'
+    django.setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+    from api.models import Dataset
+    from api.views import visible_datasets
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    tmp = tempfile.mkdtemp()
+    # DummyCache so every request takes the uncached (database) path
+    overrides = override_settings(
+        MEDIA_ROOT=tmp, REPORT_CACHE_ROOT=os.path.join(tmp, 'reports'), ALLOWED_HOSTS=['*'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    )
+    overrides.enable()
+    try:
+        counts = {}
+        for n, history in enumerate(args.histories):
+            user = User.objects.create_user(f'user{n}', password='pw')
+            upload = seed(user, history)
+            client = Client()
+            client.force_login(user)
+            pk = Dataset.objects.filter(uploaded_by=user).latest('pk').pk
+            counts[history] = {
+                'list': count_queries(client, 'get', '/api/datasets/'),
+                'detail': count_queries(client, 'get', f'/api/datasets/{pk}/'),
+                'status': count_queries(client, 'get', f'/api/datasets/{pk}/status/'),
+                'upload': count_queries(client, 'post', '/api/upload/', data={'file': upload}),
+            }
+        endpoints = list(next(iter(counts.values())))
+        print('history  ' + '  '.join(f'{e:>7}' for e in endpoints))
+        for history, row in counts.items():
+            print(f'{history:>7}  ' + '  '.join(f'{row[e]:>7}' for e in endpoints))
+
+        qs = visible_datasets(User.objects.get(username='user0')).order_by('-uploaded_at')[:5]
+        print('\nlist query plan:')
+        print(qs.explain())
+
+        growing = [e for e in endpoints if len({row[e] for row in counts.values()}) > 1]
+        if growing:
+            print(f'\nquery count grows with history: {", ".join(growing)}')
+            return 1
+        return 0
+    finally:
+        overrides.disable()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
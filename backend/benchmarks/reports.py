@@ -0,0 +1,65 @@
+"""
+Time PDF report rendering (charts included): one report, then a batch
+rendered serially and across a process pool.
+
+    python -m benchmarks.reports --batch 32 --workers 4
+"""
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from django.conf import settings
+
+SUMMARY = {
+    'total_count': 15,
+    'averages': {'Flowrate': 119.8, 'Pressure': 6.106666666666667, 'Temperature': 117.46666666666667},
+    'type_distribution': {'Pump': 4, 'Valve': 3, 'Compressor': 2, 'HeatExchanger': 2, 'Reactor': 2, 'Condenser': 2},
+}
+
+
+def _setup():
+    if not settings.configured:
+        settings.configure()
+
+
+def render(i):
+    _setup()
+    from api.reports import render_pdf
+    dataset = SimpleNamespace(id=i, pk=i, uploaded_at=datetime.now(timezone.utc), summary=SUMMARY)
+    out = io.BytesIO()
+    render_pdf(dataset, out)
+    return len(out.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    _setup()
+    render(0)  # warm imports and font caches
+    start = time.perf_counter()
+    size = render(1)
+    print(f'single report      {time.perf_counter() - start:7.3f}s  ({size / 1024:.0f} KB)')
+
+    start = time.perf_counter()
+    for i in range(args.batch):
+        render(i)
+    serial = time.perf_counter() - start
+    print(f'batch {args.batch:>3} serial   {serial:7.3f}s  ({args.batch / serial:6.1f} reports/s)')
+
+    with ProcessPoolExecutor(args.workers, initializer=_setup) as pool:
+        list(pool.map(render, range(args.workers)))  # start and warm every worker
+        start = time.perf_counter()
+        list(pool.map(render, range(args.batch)))
+        pooled = time.perf_counter() - start
+    print(f'batch {args.batch:>3} pool x{args.workers:<2} {pooled:7.3f}s  ({args.batch / pooled:6.1f} reports/s, {serial / pooled:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
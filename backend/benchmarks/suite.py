@@ -0,0 +1,267 @@
+"""
+Regression benchmarks for the upload, dataset list and PDF report endpoints
+on synthetic data (benchmarks.synthetic), through Django's test client
+against a scratch test database, with uploads summarized in the request and
+the response cache off. Scenarios:
+
+    upload  POST /api/upload/ (parse, summary, columnar cache), per rows x columns x types
+    list    GET /api/datasets/ and one keyset page of it, per history size
+    pdf     GET /api/datasets/<id>/pdf/, rendered and served from the report cache, per columns x types
+
+Every case reports latency percentiles, throughput and the peak Python
+memory (tracemalloc) of one request, and the whole run goes to a JSON file
+that a later run can be compared against:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json --fail-over 20
+    python -m benchmarks.suite --scenarios upload --rows 1000 100000 --columns 3 20 --types 6 500
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from itertools import product
+
+import django
+
+from benchmarks import synthetic
+from benchmarks.load import percentile
+
+SCENARIOS = ['upload', 'list', 'pdf']
+PDF_ROWS = 1000
+
+
+def run_case(send, iterations, prepare=None):
+    """
+    Times `send()` `iterations` times after one warm-up call, with `prepare()`
+    run untimed before each, then once more under tracemalloc (which slows
+    everything down, so it is kept out of the timings) for the peak memory.
+    """
+    def once():
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        send()
+        return time.perf_counter() - start
+
+    once()
+    times = [once() for _ in range(iterations)]
+    if prepare:
+        prepare()
+    tracemalloc.start()
+    try:
+        send()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    ms = [t * 1000 for t in times]
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(ms) / len(ms), 2),
+        'p50_ms': round(percentile(ms, 50), 2),
+        'p90_ms': round(percentile(ms, 90), 2),
+        'p99_ms': round(percentile(ms, 99), 2),
+        'max_ms': round(max(ms), 2),
+        'ops_per_s': round(iterations / sum(times), 2),
+        'peak_mb': round(peak / 1024 ** 2, 2),
+    }
+
+
+def check(response, expected=200):
+    assert response.status_code == expected, (response.status_code, getattr(response, 'data', None))
+    if response.streaming:
+        b''.join(response.streaming_content)
+        response.close()
+    return response
+
+
+class Bench:
+    """A fresh user (so retention and history never leak between cases) and a logged-in client."""
+    count = 0
+
+    def __init__(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        Bench.count += 1
+        self.user = User.objects.create_user(f'bench{Bench.count}', password='bench')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, content, columns):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        data = {'file': SimpleUploadedFile('bench.csv', content, 'text/csv')}
+        if columns != 3:
+            data['schema'] = synthetic.schema_json(columns)
+        return check(self.client.post('/api/upload/', data), 201).json()
+
+
+def upload_cases(args):
+    for rows, columns, types in product(args.rows, args.columns, args.types):
+        bench = Bench()
+        # A different seed per request so deduplication never short-circuits the parse
+        payloads = [synthetic.generate(rows, columns, types, seed) for seed in range(args.iterations + 2)]
+
+        def send():
+            bench.upload(payloads.pop(), columns)
+
+        result = run_case(send, args.iterations)
+        result['rows_per_s'] = round(result['ops_per_s'] * rows, 1)
+        yield 'upload', {'rows': rows, 'columns': columns, 'types': types}, result
+
+
+def list_cases(args):
+    from api.models import Dataset
+
+    for history in args.histories:
+        bench = Bench()
+        # One real upload for a realistic summary, then the rest of the history in bulk
+        # (bulk_create skips the retention policy, which would keep only the newest few)
+        columns, types = args.columns[0], args.types[0]
+        template = Dataset.objects.get(pk=bench.upload(synthetic.generate(PDF_ROWS, columns, types), columns)['id'])
+        Dataset.objects.bulk_create([
+            Dataset(file=template.file.name, size=template.size, summary=template.summary, schema=template.schema,
+                    content_hash=template.content_hash, uploaded_by=bench.user)
+            for _ in range(history - 1)
+        ])
+        for name, url in (('list', '/api/datasets/'), ('list_page', '/api/datasets/?limit=50')):
+            result = run_case(lambda: check(bench.client.get(url)), args.iterations)
+            yield name, {'history': history}, result
+
+
+def pdf_cases(args):
+    from api import reports
+    from api.models import Dataset
+
+    for columns, types in product(args.columns, args.types):
+        bench = Bench()
+        pk = bench.upload(synthetic.generate(PDF_ROWS, columns, types), columns)['id']
+        dataset = Dataset.objects.get(pk=pk)
+        url = f'/api/datasets/{pk}/pdf/'
+
+        result = run_case(lambda: check(bench.client.get(url)), args.iterations, prepare=lambda: reports.delete(pk))
+        yield 'pdf', {'columns': columns, 'types': types}, result
+        reports.build_report(dataset)
+        result = run_case(lambda: check(bench.client.get(url)), args.iterations)
+        yield 'pdf_cached', {'columns': columns, 'types': types}, result
+
+
+def case_name(scenario, params):
+    return ' '.join([scenario] + [f'{k}={v}' for k, v in params.items()])
+
+
+def run_suite(args):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chem_visualizer.settings')
+    os.environ['UPLOAD_WORKERS'] = '0'
+    django.setup()
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    tmp = tempfile.mkdtemp()
+    # DummyCache so every request takes the uncached path
+    overrides = override_settings(
+        MEDIA_ROOT=tmp, REPORT_CACHE_ROOT=os.path.join(tmp, 'reports'), ALLOWED_HOSTS=['*'],
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    )
+    overrides.enable()
+    try:
+        cases = {'upload': upload_cases, 'list': list_cases, 'pdf': pdf_cases}
+        for scenario in args.scenarios:
+            for name, params, result in cases[scenario](args):
+                yield {'name': case_name(name, params), 'scenario': name, 'params': params, **result}
+    finally:
+        overrides.disable()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, fail_over):
+    """Print the change against `baseline` per case; returns the names of cases whose p50 grew by more than `fail_over` %."""
+    before = {r['name']: r for r in baseline['results']}
+    print(f"\nagainst {baseline['meta'].get('commit') or '?'} ({baseline['meta']['created']}):")
+    regressed = []
+    for r in results:
+        old = before.get(r['name'])
+        if old is None:
+            print(f"  {r['name']:<44} (new)")
+            continue
+        changes = {key: (r[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+                   for key in ('p50_ms', 'p99_ms', 'ops_per_s', 'peak_mb')}
+        print(f"  {r['name']:<44} p50 {changes['p50_ms']:+6.1f}%  p99 {changes['p99_ms']:+6.1f}%  "
+              f"ops/s {changes['ops_per_s']:+6.1f}%  peak {changes['peak_mb']:+6.1f}%")
+        if fail_over is not None and changes['p50_ms'] > fail_over:
+            regressed.append(r['name'])
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--rows', nargs='+', type=int, default=[1000, 50_000], help='Rows per uploaded file.')
+    parser.add_argument('--columns', nargs='+', type=int, default=[3], help='Numeric columns per file (the sample has 3).')
+    parser.add_argument('--types', nargs='+', type=int, default=[6], help='Distinct equipment types (the sample has 6).')
+    parser.add_argument('--histories', nargs='+', type=int, default=[10, 1000], help='Datasets in the history being listed.')
+    parser.add_argument('--iterations', type=int, default=10, help='Timed requests per case.')
+    parser.add_argument('--output', default='benchmark-results.json', help='Where to write the results.')
+    parser.add_argument('--compare', metavar='BASELINE', help='Results file of an earlier run to compare against.')
+    parser.add_argument('--fail-over', type=float, metavar='PCT',
+                        help='With --compare, exit non-zero if any median latency grew by more than PCT %%.')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = []
+    print(f"{'case':<44} {'p50':>8} {'p90':>8} {'p99':>8} {'ops/s':>8} {'peak MB':>8}")
+    for r in run_suite(args):
+        results.append(r)
+        print(f"{r['name']:<44} {r['p50_ms']:8.1f} {r['p90_ms']:8.1f} {r['p99_ms']:8.1f} {r['ops_per_s']:8.1f} {r['peak_mb']:8.1f}",
+              flush=True)
+
+    run = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'fail_over')},
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f'\nwrote {args.output}')
+
+    if baseline is not None:
+        regressed = compare(results, baseline, args.fail_over)
+        if regressed:
+            print(f"\nmedian latency regressed by more than {args.fail_over:g}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
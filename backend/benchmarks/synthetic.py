@@ -0,0 +1,83 @@
+"""
+Synthetic equipment data shaped like sample_equipment_data.csv: named
+equipment of a handful of types, each type with its own typical Flowrate,
+Pressure and Temperature. Scales in rows, numeric columns (beyond the
+sample's three, extra `ParamN` columns) and type cardinality (beyond the
+sample's six, extra `TypeN` types), and is deterministic for a given seed.
+
+    from benchmarks import synthetic
+    synthetic.generate(100_000, columns=10, types=50, seed=1)   # CSV bytes
+    synthetic.schema(10)   # upload schema that parses all 10 numeric columns
+"""
+import json
+import random
+
+# Per-type weight and (Flowrate, Pressure, Temperature) centres, from the sample file
+SAMPLE_TYPES = {
+    'Pump': (4, (126, 5.5, 114)),
+    'Valve': (3, (60, 4.1, 104)),
+    'Compressor': (2, (97, 8.2, 96)),
+    'HeatExchanger': (2, (152, 6.25, 131)),
+    'Reactor': (2, (142, 7.35, 139)),
+    'Condenser': (2, (162, 6.85, 126)),
+}
+PARAMETERS = ['Flowrate', 'Pressure', 'Temperature']
+RANGES = [(58, 165), (4.0, 8.4), (95, 140)]
+DECIMALS = [1, 2, 1]
+EXTRA_RANGE = (0, 1000)
+
+
+def numeric_columns(columns=3):
+    return (PARAMETERS + [f'Param{i}' for i in range(len(PARAMETERS) + 1, columns + 1)])[:columns]
+
+
+def schema(columns=3):
+    """Upload schema reading the Type column and all `columns` numeric columns."""
+    return {
+        'columns': [{'name': 'Type', 'dtype': 'category'}]
+                   + [{'name': name, 'dtype': 'float'} for name in numeric_columns(columns)],
+        'category': 'Type',
+    }
+
+
+def schema_json(columns=3):
+    return json.dumps(schema(columns))
+
+
+def equipment_types(types, columns, rng):
+    """[(name, weight, centres)] for `types` types: the sample's first, then random ones."""
+    ranges = (RANGES + [EXTRA_RANGE] * max(0, columns - len(RANGES)))[:columns]
+    result = []
+    for i in range(types):
+        if i < len(SAMPLE_TYPES):
+            name, (weight, centres) = list(SAMPLE_TYPES.items())[i]
+            centres = list(centres)
+        else:
+            name, weight, centres = f'Type{i + 1}', 2, []
+        centres = (centres + [rng.uniform(lo, hi) for lo, hi in ranges[len(centres):]])[:columns]
+        result.append((name, weight, centres))
+    return result
+
+
+def iter_lines(rows, columns=3, types=6, seed=0):
+    """CSV text lines, header first, each ending in a newline."""
+    rng = random.Random(seed)
+    catalogue = equipment_types(types, columns, rng)
+    weights = [weight for _, weight, _ in catalogue]
+    decimals = (DECIMALS + [2] * columns)[:columns]
+    yield ','.join(['Equipment Name', 'Type'] + numeric_columns(columns)) + '\n'
+    counts = {}
+    for _ in range(rows):
+        name, _, centres = rng.choices(catalogue, weights)[0]
+        counts[name] = counts.get(name, 0) + 1
+        values = [f'{rng.gauss(c, abs(c) * 0.02):.{d}f}' for c, d in zip(centres, decimals)]
+        yield f'{name}-{counts[name]},{name},' + ','.join(values) + '\n'
+
+
+def generate(rows, columns=3, types=6, seed=0):
+    return ''.join(iter_lines(rows, columns, types, seed)).encode()
+
+
+def write(path, rows, columns=3, types=6, seed=0):
+    with open(path, 'w') as f:
+        f.writelines(iter_lines(rows, columns, types, seed))
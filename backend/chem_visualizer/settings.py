@@ -1,10 +1,19 @@
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-SECRET_KEY = 'dev-secret-key'
-DEBUG = True
-ALLOWED_HOSTS = []
+
+# Development defaults; a production deployment sets these from the environment
+# (see "Production deployment" in the README)
+DEBUG = os.environ.get('DJANGO_DEBUG', '1').lower() in ('1', 'true', 'yes')
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'dev-secret-key' if DEBUG else '')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY when DJANGO_DEBUG is off')
+ALLOWED_HOSTS = [h for h in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if h]
+
+# Where the database (SQLite), uploads, the response cache and rendered reports live
+DATA_DIR = Path(os.environ.get('DJANGO_DATA_DIR', BASE_DIR))
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -44,13 +53,48 @@ TEMPLATES = [{
 }]
 
 WSGI_APPLICATION = 'chem_visualizer.wsgi.application'
+ASGI_APPLICATION = 'chem_visualizer.asgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# PostgreSQL when POSTGRES_DB is set (needs `pip install "psycopg[binary,pool]"`), SQLite otherwise
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', ''),
+            'PORT': os.environ.get('POSTGRES_PORT', ''),
+            # Keep connections open between requests instead of reconnecting for each
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes'):
+        # A psycopg connection pool per process instead; better under ASGI,
+        # where persistent connections are not reused across requests
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': DATA_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+            'OPTIONS': {
+                # Wait for a concurrent writer instead of failing with "database is locked"
+                'timeout': 20,
+                # WAL lets readers run alongside the single writer; IMMEDIATE takes the write lock
+                # when a transaction starts rather than failing to upgrade a read lock midway
+                'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -62,12 +106,75 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_ROOT = DATA_DIR / 'media'
+
+# Uploaded files are kept gzip-compressed on disk and inflated when read or served
+STORAGES = {
+    'default': {'BACKEND': 'api.storage.CompressedFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+DATASET_COMPRESS_LEVEL = 1
+
+# Uploads are hashed as they arrive so identical re-uploads can share storage and summaries
+FILE_UPLOAD_HANDLERS = [
+    'api.dedup.HashingMemoryFileUploadHandler',
+    'api.dedup.HashingTemporaryFileUploadHandler',
+]
+
+# File-based by default so every web worker and the upload worker pool share invalidations.
+# DJANGO_CACHE=redis (with REDIS_URL) does the same across machines; DJANGO_CACHE=locmem is
+# per process and only correct with a single web worker and UPLOAD_WORKERS=0.
+CACHE_BACKENDS = {
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DATA_DIR / 'cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://localhost:6379/0'),
+    },
+    'locmem': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+CACHES = {'default': CACHE_BACKENDS[os.environ.get('DJANGO_CACHE', 'file')]}
+DATASET_CACHE_TIMEOUT = 300
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Size of the process pool that summarizes uploads; 0 processes them inline
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', os.cpu_count() or 1))
+
+# Per-user dataset retention, applied after every upload and by `manage.py prune_datasets`.
+# None disables a limit; a user's newest dataset is always kept.
+DATASET_RETENTION = {
+    'MAX_COUNT': 5,
+    'MAX_AGE_DAYS': None,
+    'MAX_BYTES': None,
+}
+
+# Dataset event stream (GET /api/datasets/events/): how often each server process polls
+# for new events, the idle keepalive, and how long events are kept for reconnecting clients
+# (older ones are trimmed at most hourly by each process that publishes events)
+EVENT_POLL_INTERVAL = 1.0
+EVENT_KEEPALIVE = 15
+EVENT_RETENTION = 24 * 3600
+
+# Files (including zip archive members) accepted by one bulk upload request, and how much
+# the zip archives in it may inflate to in total
+BULK_UPLOAD_MAX_FILES = 200
+BULK_UPLOAD_MAX_BYTES = 1024 * 1024 * 1024
+
+# Rendered PDF reports, evicted least-recently-used beyond the size limit.
+# With PRERENDER_REPORTS the upload worker pool renders each report once the summary is ready.
+REPORT_CACHE_ROOT = DATA_DIR / 'reports'
+REPORT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+PRERENDER_REPORTS = True
+
+# Lifetime in seconds of API tokens issued by POST /api/auth/token/
+AUTH_TOKEN_TTL = 7 * 24 * 3600
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'api.auth.TokenAuthentication',
         'api.auth.NoPopupBasicAuth',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -76,3 +183,10 @@ REST_FRAMEWORK = {
     ]
 }
 
+if not DEBUG:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {'console': {'class': 'logging.StreamHandler'}},
+        'root': {'handlers': ['console'], 'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO')},
+    }
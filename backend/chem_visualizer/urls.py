@@ -1,10 +1,11 @@
-from django.urls import path, include
+import re
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from api.views import serve_media
 
 urlpatterns = [
     path('api/', include('api.urls')),
+    # Stored datasets are gzip bytes under their .csv names, which only serve_media turns back
+    # into what was uploaded, and only for their owners (or admins), with DEBUG off too
+    re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>datasets/.*)$", serve_media),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
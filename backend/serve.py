@@ -0,0 +1,46 @@
+"""
+Production entry point: the ASGI application under uvicorn with several
+worker processes, e.g.
+
+    DJANGO_DEBUG=0 DJANGO_SECRET_KEY=... DJANGO_ALLOWED_HOSTS=example.com python serve.py --workers 4
+
+Every web worker starts its own upload pool, so UPLOAD_WORKERS defaults
+to the CPU count divided by the number of web workers here. Run
+`python manage.py migrate` first. Uploads a previous run left pending
+are processed (`manage.py recover_datasets`) before the server starts
+taking requests. Serve static files from the reverse
+proxy and pass /media/datasets/ through: stored datasets are gzipped, and
+Django sends them with the right Content-Encoding (or inflated).
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)))
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chem_visualizer.settings')
+    os.environ.setdefault('UPLOAD_WORKERS', str(max(1, (os.cpu_count() or 1) // args.workers)))
+    import django
+    import uvicorn
+    from django.core.management import call_command
+    from django.db import connections
+
+    django.setup()
+    # No web worker is running yet, so nothing else can be working on them
+    call_command('recover_datasets')
+    connections.close_all()
+
+    uvicorn.run(
+        'chem_visualizer.asgi:application', host=args.host, port=args.port, workers=args.workers,
+        # Django's ASGI handler does not implement the lifespan protocol
+        lifespan='off', proxy_headers=True,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+On-disk cache of what the desktop client last saw from the server, so it
+starts from cache, works read-only offline and revalidates instead of
+refetching: dataset metadata and summaries keyed by id (SQLite), the
+ETag of the dataset list, and downloaded PDF reports with their ETags.
+One cache per server and user.
+"""
+import hashlib
+import hmac
+import json
+import os
+import sqlite3
+import threading
+
+LOGIN_ITERATIONS = 100_000
+
+
+def default_root():
+    return os.environ.get("CHEM_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".chem_visualizer", "cache")
+
+
+class LocalCache:
+    """Safe to share between the GUI thread and network tasks."""
+
+    def __init__(self, api_base, username, root=None):
+        key = hashlib.sha256(f"{api_base}|{username}".encode()).hexdigest()[:16]
+        self.root = os.path.join(root or default_root(), key)
+        os.makedirs(os.path.join(self.root, "reports"), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(self.root, "cache.sqlite3"), check_same_thread=False)
+        with self.lock, self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS datasets (id INTEGER PRIMARY KEY, uploaded_at TEXT NOT NULL, data TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS reports (dataset_id INTEGER PRIMARY KEY, etag TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # ------------------------ DATASETS ----------------------
+    def datasets(self, limit):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT data FROM datasets ORDER BY uploaded_at DESC, id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def replace_datasets(self, datasets, etag):
+        """Store the server's dataset list (and its ETag), forgetting datasets no longer on it."""
+        ids = [ds["id"] for ds in datasets]
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM datasets")
+            self.db.executemany(
+                "INSERT INTO datasets (id, uploaded_at, data) VALUES (?, ?, ?)",
+                [(ds["id"], ds["uploaded_at"], json.dumps(ds)) for ds in datasets],
+            )
+            self._set_meta("list_etag", etag or "")
+            stale = self.db.execute(
+                f"SELECT dataset_id FROM reports WHERE dataset_id NOT IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        for pk, in stale:
+            self.remove_report(pk)
+
+    def put_dataset(self, ds):
+        with self.lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO datasets (id, uploaded_at, data) VALUES (?, ?, ?)",
+                (ds["id"], ds["uploaded_at"], json.dumps(ds)),
+            )
+
+    def remove_dataset(self, pk):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM datasets WHERE id = ?", (pk,))
+        self.remove_report(pk)
+
+    def list_etag(self):
+        with self.lock:
+            return self._get_meta("list_etag") or None
+
+    # ------------------------ REPORTS -----------------------
+    def report_path(self, pk):
+        return os.path.join(self.root, "reports", f"{pk}.pdf")
+
+    def report_etag(self, pk):
+        """ETag of the cached report, or None when there is no usable copy."""
+        with self.lock:
+            row = self.db.execute("SELECT etag FROM reports WHERE dataset_id = ?", (pk,)).fetchone()
+        if row is None or not os.path.exists(self.report_path(pk)):
+            return None
+        return row[0]
+
+    def store_report(self, pk, etag, path):
+        """Move the freshly downloaded report at `path` into the cache."""
+        os.replace(path, self.report_path(pk))
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO reports (dataset_id, etag) VALUES (?, ?)", (pk, etag or ""))
+
+    def remove_report(self, pk):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM reports WHERE dataset_id = ?", (pk,))
+        try:
+            os.remove(self.report_path(pk))
+        except FileNotFoundError:
+            pass
+
+    # ------------------------ OFFLINE LOGIN -----------------
+    def remember_login(self, password):
+        """Keep a salted hash of a password the server accepted, to check offline logins against."""
+        salt = os.urandom(16)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, LOGIN_ITERATIONS)
+        with self.lock, self.db:
+            self._set_meta("login", f"{salt.hex()}${digest.hex()}")
+
+    def login_matches(self, password):
+        with self.lock:
+            stored = self._get_meta("login")
+        if not stored:
+            return False
+        salt, digest = stored.split("$")
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), LOGIN_ITERATIONS)
+        return hmac.compare_digest(candidate.hex(), digest)
+
+    def _get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
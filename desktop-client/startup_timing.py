@@ -0,0 +1,82 @@
+"""
+Startup timing for the desktop client: launches desktop_app.py repeatedly
+with CHEM_STARTUP_TIMING set, which makes it report and quit as soon as the
+login dialog is up and the main window's imports are prewarmed, and prints
+the median and worst of each phase.
+
+    python startup_timing.py --runs 10
+    python startup_timing.py --runs 5 --importtime   # also the slowest imports of one run
+
+Runs on the offscreen Qt platform unless --show is given. Times are ms;
+`process_ms` is from launching the interpreter to the first window.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "desktop_app.py")
+
+
+def run_once(env):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, APP], cwd=HERE, env=env, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    process_ms = (time.perf_counter() - start) * 1000
+    proc.wait(timeout=30)
+    if not line:
+        raise RuntimeError(f"desktop_app.py exited with {proc.returncode} without reporting timings")
+    timings = json.loads(line)
+    # The report comes once prewarming is done too, which may be after the first window
+    reported_at = max(timings["first_window_ms"], timings["prewarmed_ms"])
+    timings["process_ms"] = round(process_ms - (reported_at - timings["first_window_ms"]), 1)
+    return timings
+
+
+def slowest_imports(env, count=15):
+    """Cumulative times of the top-level imports in one run under -X importtime, slowest first."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", APP], cwd=HERE, env=env, capture_output=True, text=True, timeout=60
+    )
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented further
+        if not name.startswith("  "):
+            imports.append((name.strip(), int(cumulative) / 1000))
+    return sorted(imports, key=lambda item: -item[1])[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--show", action="store_true", help="Use the real display instead of the offscreen platform.")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports of one run.")
+    parser.add_argument("--json", action="store_true", help="Print every run as one JSON object per line.")
+    args = parser.parse_args()
+
+    env = dict(os.environ, CHEM_STARTUP_TIMING="1")
+    if not args.show:
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    runs = [run_once(env) for _ in range(args.runs)]
+    if args.json:
+        for run in runs:
+            print(json.dumps(run))
+    else:
+        for key in ("imports_ms", "first_window_ms", "process_ms", "prewarmed_ms"):
+            values = [run[key] for run in runs]
+            print(f"{key:<16} median {statistics.median(values):8.1f}  max {max(values):8.1f}")
+    if args.importtime:
+        print("\nslowest imports (cumulative ms, one run):")
+        for name, ms in slowest_imports(env):
+            print(f"  {name:<24} {ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
-import React, { useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import LoginForm from "./components/LoginForm";
 import RegisterForm from "./components/RegisterForm";
 import UploadForm from "./components/UploadForm";
 import DataTable from "./components/DataTable";
 import Charts from "./components/Charts";
 import axios from "axios";
+import { subscribeDatasets, upsertDataset } from "./events";
+import { authHeaders, requestToken, revokeToken } from "./auth";
 
 import {
   Box,
@@ -31,21 +33,57 @@ import AdminPanelSettingsIcon from '@mui/icons-material/AdminPanelSettings';
 function App() {
   const [datasets, setDatasets] = useState([]);
   const [selected, setSelected] = useState(null);
+  // { username, token } once logged in
   const [auth, setAuth] = useState(null);
   const [loginError, setLoginError] = useState(null);
   const [registerError, setRegisterError] = useState(null);
   const [showRegister, setShowRegister] = useState(false);
   const [isAdmin, setIsAdmin] = useState(false);
+  // Uploads still processing on the server, to report their failure
+  const pending = useRef(new Set());
+
+  // The server announces dataset changes; no need to re-fetch the list
+  useEffect(() => {
+    if (!auth) return undefined;
+    return subscribeDatasets(auth, (kind, data) => {
+      if (kind === "deleted") {
+        setDatasets((prev) => prev.filter((d) => d.id !== data.id));
+        setSelected((prev) => (prev && prev.id === data.id ? null : prev));
+        return;
+      }
+      const dataset = data.dataset;
+      if (!dataset) return;
+      if (kind === "processed" && pending.current.has(dataset.id) && dataset.status !== "processing") {
+        pending.current.delete(dataset.id);
+        if (dataset.status === "failed") alert(`Processing failed: ${dataset.error}`);
+      }
+      setDatasets((prev) => upsertDataset(prev, dataset));
+      setSelected((prev) => (prev && prev.id === dataset.id ? dataset : prev));
+    });
+  }, [auth]);
 
   // Handle login from LoginForm
   const handleLogin = async (credentials) => {
     try {
+      const tokenRes = await requestToken(credentials);
+
+      // Wrong password (401 or 403)
+      if (tokenRes.status === 401 || tokenRes.status === 403) {
+        setLoginError("Invalid username or password!");
+        return;
+      }
+
+      if (tokenRes.status >= 500) {
+        setLoginError("Server error occurred. Please try again later.");
+        return;
+      }
+
+      const session = { username: tokenRes.data.username, token: tokenRes.data.token };
       const res = await axios.get("/api/datasets/", {
-        auth: credentials,
+        headers: authHeaders(session),
         validateStatus: () => true
       });
 
-      // Wrong password (401 or 403)
       if (res.status === 401 || res.status === 403) {
         setLoginError("Invalid username or password!");
         return;
@@ -65,10 +103,10 @@ function App() {
       }
 
       // Check if user is admin by trying to fetch all datasets
-      const adminCheck = credentials.username === 'admin' || res.data.some(d => d.uploaded_by_username && d.uploaded_by_username !== credentials.username);
+      const adminCheck = tokenRes.data.is_staff || credentials.username === 'admin' || res.data.some(d => d.uploaded_by_username && d.uploaded_by_username !== credentials.username);
       
       // Success
-      setAuth(credentials);
+      setAuth(session);
       setIsAdmin(adminCheck);
       setLoginError(null);
       setDatasets(res.data);
@@ -106,6 +144,7 @@ function App() {
   };
 
   const handleLogout = () => {
+    if (auth) revokeToken(auth);
     setAuth(null);
     setDatasets([]);
     setSelected(null);
@@ -114,21 +153,10 @@ function App() {
     setIsAdmin(false);
   };
 
-  const fetchDatasets = async () => {
-    if (!auth) return;
-
-    try {
-      const res = await axios.get("/api/datasets/", {
-        auth: auth,
-      });
-
-      if (Array.isArray(res.data)) {
-        setDatasets(res.data);
-        setSelected(res.data.length ? res.data[0] : null);
-      }
-    } catch (err) {
-      console.error("Error fetching datasets:", err);
-    }
+  const handleUploaded = (dataset) => {
+    if (dataset.status === "pending") pending.current.add(dataset.id);
+    setDatasets((prev) => upsertDataset(prev, dataset));
+    setSelected(dataset);
   };
 
   const downloadPDF = async () => {
@@ -136,7 +164,7 @@ function App() {
     
     try {
       const res = await axios.get(`/api/datasets/${selected.id}/pdf/`, {
-        auth: auth,
+        headers: authHeaders(auth),
         responseType: 'blob',
       });
       
@@ -214,7 +242,7 @@ function App() {
 
       <Container maxWidth="xl" sx={{ mt: 4, pb: 4 }}>
         <Card sx={{ p: 3, mb: 3, borderRadius: 3, boxShadow: '0 8px 32px rgba(0,0,0,0.1)' }} elevation={6}>
-          <UploadForm onUploaded={fetchDatasets} auth={auth} />
+          <UploadForm onUploaded={handleUploaded} auth={auth} />
         </Card>
 
         <Box sx={{ display: "flex", gap: 3, flexWrap: { xs: 'wrap', lg: 'nowrap' } }}>
@@ -262,6 +290,7 @@ function App() {
                         secondary={
                           <>
                             {time}
+                            {d.status && d.status !== "ready" && <> ({d.status})</>}
                             {isAdmin && <><br />By: {uploader}</>}
                           </>
                         }
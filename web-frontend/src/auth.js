@@ -0,0 +1,17 @@
+// API tokens: the password is sent once, to POST /api/auth/token/, and every
+// later request carries the token instead, so the server does not hash the
+// password on each call.
+import axios from "axios";
+
+export function requestToken(credentials) {
+  return axios.post("/api/auth/token/", { ...credentials, name: "web" }, { validateStatus: () => true });
+}
+
+export function authHeaders(auth) {
+  return { Authorization: `Bearer ${auth.token}` };
+}
+
+// Best effort: an unrevoked token still expires on its own
+export function revokeToken(auth) {
+  return axios.delete("/api/auth/token/", { headers: authHeaders(auth) }).catch(() => {});
+}
@@ -1,5 +1,6 @@
 import React, { useState } from "react";
 import axios from "axios";
+import { authHeaders } from "../auth";
 import {
   Box,
   Button,
@@ -28,16 +29,16 @@ export default function UploadForm({ onUploaded, auth }) {
 
     try {
       setLoading(true);
-      await axios.post("/api/upload/", fd, {
-        headers: { "Content-Type": "multipart/form-data" },
-        auth: auth,
+      const res = await axios.post("/api/upload/", fd, {
+        headers: { "Content-Type": "multipart/form-data", ...authHeaders(auth) },
       });
 
       setLoading(false);
-      alert("Upload successful!");
+      // 202: the summary is computed in the background; the event stream reports when it is ready
+      alert(res.status === 202 ? "Upload received, processing on the server..." : "Upload successful!");
       setFile(null);
 
-      onUploaded && onUploaded();
+      onUploaded && onUploaded(res.data);
     } catch (err) {
       setLoading(false);
       alert("Upload failed.");
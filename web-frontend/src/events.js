@@ -0,0 +1,67 @@
+import { authHeaders } from "./auth";
+
+// Follows the server's dataset event stream (server-sent events) and calls
+// onEvent(kind, data) for each event. Uses fetch rather than EventSource so
+// the token header can be sent, and reconnects with Last-Event-ID so
+// nothing is missed. Returns a function that closes the stream.
+export function subscribeDatasets(auth, onEvent) {
+  const controller = new AbortController();
+  let lastId = null;
+  let retryMs = 3000;
+
+  const dispatch = (block) => {
+    let kind = "message";
+    const data = [];
+    for (const line of block.split("\n")) {
+      if (line.startsWith("id:")) lastId = line.slice(3).trim();
+      else if (line.startsWith("event:")) kind = line.slice(6).trim();
+      else if (line.startsWith("data:")) data.push(line.slice(5).replace(/^ /, ""));
+      else if (line.startsWith("retry:")) retryMs = parseInt(line.slice(6), 10) || retryMs;
+    }
+    if (data.length) onEvent(kind, JSON.parse(data.join("\n")));
+  };
+
+  const run = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const headers = {
+          Accept: "text/event-stream",
+          ...authHeaders(auth),
+        };
+        if (lastId) headers["Last-Event-ID"] = lastId;
+        const res = await fetch("/api/datasets/events/", { headers, signal: controller.signal });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          let end;
+          while ((end = buffer.indexOf("\n\n")) >= 0) {
+            dispatch(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+          }
+        }
+      } catch (err) {
+        if (controller.signal.aborted) return;
+        console.warn("Dataset event stream disconnected:", err);
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs));
+    }
+  };
+
+  run();
+  return () => controller.abort();
+}
+
+// Insert or replace `dataset` in a newest-first history of at most `size` entries.
+export function upsertDataset(datasets, dataset, size = 5) {
+  if (datasets.some((d) => d.id === dataset.id)) {
+    return datasets.map((d) => (d.id === dataset.id ? dataset : d));
+  }
+  return [...datasets, dataset]
+    .sort((a, b) => new Date(b.uploaded_at) - new Date(a.uploaded_at))
+    .slice(0, size);
+}